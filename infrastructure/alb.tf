@@ -72,6 +72,33 @@ resource "aws_lb_target_group_attachment" "blender_tg_attachment" {
   port             = 8501
 }
 
+# API Target Group
+resource "aws_lb_target_group" "blender_api_tg" {
+  name     = "blender-api-target-group"
+  port     = 8502
+  protocol = "HTTP"
+  vpc_id   = module.vpc.vpc_id
+
+  health_check {
+    enabled             = true
+    healthy_threshold   = 2
+    interval           = 30
+    matcher            = "404"
+    path              = "/"
+    port              = "traffic-port"
+    protocol          = "HTTP"
+    timeout           = 5
+    unhealthy_threshold = 2
+  }
+}
+
+# API Target Group Attachment
+resource "aws_lb_target_group_attachment" "blender_api_tg_attachment" {
+  target_group_arn = aws_lb_target_group.blender_api_tg.arn
+  target_id        = aws_instance.server_instance.id
+  port             = 8502
+}
+
 # HTTPS Listener
 resource "aws_lb_listener" "front_end" {
   load_balancer_arn = aws_lb.blender_alb.arn
@@ -99,6 +126,61 @@ resource "aws_lb_listener" "front_end" {
   }
 }
 
+# Route /api/* to the render API, behind the same Cognito authentication
+resource "aws_lb_listener_rule" "api" {
+  listener_arn = aws_lb_listener.front_end.arn
+  priority     = 10
+
+  action {
+    type = "authenticate-cognito"
+
+    authenticate_cognito {
+      user_pool_arn       = aws_cognito_user_pool.blender_pool.arn
+      user_pool_client_id = aws_cognito_user_pool_client.blender_client.id
+      user_pool_domain    = aws_cognito_user_pool_domain.blender_domain.domain
+    }
+
+    order = 1
+  }
+
+  action {
+    type             = "forward"
+    target_group_arn = aws_lb_target_group.blender_api_tg.arn
+    order            = 2
+  }
+
+  condition {
+    path_pattern {
+      values = ["/api/*"]
+    }
+  }
+}
+
+# Route /api/* requests carrying a bearer token to the render API without Cognito, for scripts and CI.
+# The API rejects requests whose token does not match api.token_sha256
+resource "aws_lb_listener_rule" "api_token" {
+  listener_arn = aws_lb_listener.front_end.arn
+  priority     = 5
+
+  action {
+    type             = "forward"
+    target_group_arn = aws_lb_target_group.blender_api_tg.arn
+  }
+
+  condition {
+    path_pattern {
+      values = ["/api/*"]
+    }
+  }
+
+  condition {
+    http_header {
+      http_header_name = "Authorization"
+      values           = ["Bearer *"]
+    }
+  }
+}
+
 # HTTP Listener (Redirect to HTTPS)
 resource "aws_lb_listener" "http" {
   load_balancer_arn = aws_lb.blender_alb.arn
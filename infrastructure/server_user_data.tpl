@@ -35,6 +35,8 @@ export WORKSPACE_ROOT='/mnt/efs/workspace'
 envsubst < config.yaml > config.tmp.yaml
 mv config.tmp.yaml config.yaml
 sudo envsubst < manifests/blender-server.service > /etc/systemd/system/blender-server.service
+sudo envsubst < manifests/blender-api.service > /etc/systemd/system/blender-api.service
+sudo envsubst < manifests/blender-janitor.service > /etc/systemd/system/blender-janitor.service
 sudo systemctl daemon-reload
-sudo systemctl enable blender-server
-sudo systemctl start blender-server
+sudo systemctl enable blender-server blender-api blender-janitor
+sudo systemctl start blender-server blender-api blender-janitor
@@ -0,0 +1,19 @@
+import json
+import sys
+
+import bpy
+
+# Job overrides are passed as JSON after "--"
+overrides = json.loads(sys.argv[sys.argv.index('--') + 1]) if '--' in sys.argv else {}
+
+for scene in bpy.data.scenes:
+    if 'camera' in overrides:
+        scene.camera = bpy.data.objects[overrides['camera']]
+    if 'samples' in overrides:
+        scene.cycles.samples = int(overrides['samples'])
+    if 'resolution_x' in overrides:
+        scene.render.resolution_x = int(overrides['resolution_x'])
+    if 'resolution_y' in overrides:
+        scene.render.resolution_y = int(overrides['resolution_y'])
+    if 'resolution_percentage' in overrides:
+        scene.render.resolution_percentage = int(overrides['resolution_percentage'])
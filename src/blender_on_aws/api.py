@@ -0,0 +1,409 @@
+import argparse
+import hashlib
+import hmac
+import json
+import mimetypes
+import re
+import shutil
+import sys
+import tempfile
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, unquote, urlparse
+
+from blender_on_aws.models.db import get_worker_dead_after
+from blender_on_aws.services.batch_service import BatchService
+from blender_on_aws.services.bundle_service import BundleService
+from blender_on_aws.services.export_service import ExportService
+from blender_on_aws.services.manifest_service import ManifestService
+from blender_on_aws.services.metrics_service import MetricsService
+from blender_on_aws.utils.frames import parse_frames
+from blender_on_aws.utils.runtime import StartupError, initialize_runtime
+
+EXPORT_PATH = re.compile(r'^/api/jobs/(?P<job_id>\d+)/export\.zip$')
+SOURCE_PATH = re.compile(r'^/api/jobs/(?P<job_id>\d+)/source$')
+UPLOAD_PATH = re.compile(r'^/api/sources/(?P<filename>[^/]+)$')
+BATCH_PATH = re.compile(r'^/api/jobs/batch$')
+BUNDLES_PATH = re.compile(r'^/api/bundles$')
+BUNDLE_UPLOAD_PATH = re.compile(r'^/api/bundles/(?P<filename>[^/]+)$')
+FILE_PATH = re.compile(r'^/api/jobs/(?P<job_id>\d+)/files/(?P<path>.+)$')
+RANGE_HEADER = re.compile(r'^bytes=(?P<start>\d*)-(?P<end>\d*)$')
+# Job subdirectories whose files may be served
+OUTPUT_DIRS = {'render', 'static', 'stream', 'sheets'}
+OUTPUT_CONTENT_TYPES = {
+    '.m3u8': 'application/vnd.apple.mpegurl',
+    '.ts': 'video/mp2t',
+    '.mkv': 'video/x-matroska',
+}
+ASSET_PATH = re.compile(r'^/api/assets/(?P<asset_id>[0-9a-f]{64})$')
+METRICS_PATH = re.compile(r'^/api/metrics$')
+BEARER_TOKEN = re.compile(r'^Bearer\s+(?P<token>\S+)$', re.IGNORECASE)
+
+
+class RequestBody:
+    """Readable stream limited to the Content-Length of a request."""
+
+    def __init__(self, stream, length: int):
+        self.stream = stream
+        self.remaining = length
+
+    def read(self, size: int = -1) -> bytes:
+        if size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.stream.read(size) if size else b''
+        self.remaining -= len(data)
+        return data
+
+
+class ApiHandler(BaseHTTPRequestHandler):
+    """HTTP handler for the render API. Services are attached to the server instance."""
+
+    def authorize(self) -> bool:
+        """
+        Check the bearer token of requests sent by scripts and CI.
+
+        The ALB forwards requests with an Authorization header without Cognito authentication,
+        so they must carry one of the configured tokens. Other requests passed Cognito.
+
+        Returns:
+            bool: True if the request may proceed, otherwise a 401 response was sent
+        """
+        header = self.headers.get('Authorization')
+        if header is None:
+            return True
+
+        match = BEARER_TOKEN.match(header.strip())
+        if match:
+            digest = hashlib.sha256(match.group('token').encode()).hexdigest()
+            # Compare against every token so the response time does not reveal which one matched
+            valid = [hmac.compare_digest(digest, token_hash) for token_hash in self.server.token_hashes]
+            if any(valid):
+                return True
+
+        self.send_response(HTTPStatus.UNAUTHORIZED)
+        self.send_header('WWW-Authenticate', 'Bearer')
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+        return False
+
+    def do_GET(self):
+        if not self.authorize():
+            return
+        url = urlparse(self.path)
+
+        match = EXPORT_PATH.match(url.path)
+        if match:
+            return self.export_job(int(match.group('job_id')), parse_qs(url.query))
+
+        match = SOURCE_PATH.match(url.path)
+        if match:
+            return self.download_source(int(match.group('job_id')))
+
+        match = FILE_PATH.match(url.path)
+        if match:
+            return self.download_output(
+                int(match.group('job_id')), unquote(match.group('path')), 'download' in parse_qs(url.query)
+            )
+
+        if METRICS_PATH.match(url.path):
+            return self.send_json(HTTPStatus.OK, self.server.metrics_service.collect())
+
+        self.send_error(HTTPStatus.NOT_FOUND)
+
+    def do_PUT(self):
+        if not self.authorize():
+            return
+        url = urlparse(self.path)
+
+        match = UPLOAD_PATH.match(url.path)
+        if match:
+            return self.upload_source(unquote(match.group('filename')))
+
+        if BUNDLE_UPLOAD_PATH.match(url.path):
+            return self.upload_bundle()
+
+        match = ASSET_PATH.match(url.path)
+        if match:
+            return self.upload_asset(match.group('asset_id'))
+
+        self.send_error(HTTPStatus.NOT_FOUND)
+
+    def do_POST(self):
+        if not self.authorize():
+            return
+        url = urlparse(self.path)
+
+        if BATCH_PATH.match(url.path):
+            return self.submit_batch()
+
+        if BUNDLES_PATH.match(url.path):
+            return self.create_bundle()
+
+        self.send_error(HTTPStatus.NOT_FOUND)
+
+    def send_json(self, status: HTTPStatus, payload: dict):
+        """Send a JSON response."""
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def upload_source(self, filename: str):
+        """Store a scene once so several jobs can share it. The body is the raw file content."""
+        if 'Content-Length' not in self.headers:
+            return self.send_error(HTTPStatus.LENGTH_REQUIRED)
+
+        length = int(self.headers['Content-Length'])
+        max_bytes = self.server.max_bundle_bytes
+        if max_bytes is not None and length > max_bytes:
+            return self.send_error(HTTPStatus.REQUEST_ENTITY_TOO_LARGE, f'Source file exceeds {max_bytes} bytes')
+
+        body = RequestBody(self.rfile, length)
+        try:
+            source_path = self.server.workspace_service.store_source(body, filename, max_bytes=max_bytes)
+        except ValueError as e:
+            return self.send_error(HTTPStatus.REQUEST_ENTITY_TOO_LARGE, str(e))
+        source_id = f'{source_path.parent.name}/{source_path.name}'
+        self.send_json(HTTPStatus.CREATED, {'source': source_id})
+
+    def upload_bundle(self):
+        """Store a zip or tar archive of a project directory. Files already in the asset cache are not stored again."""
+        if 'Content-Length' not in self.headers:
+            return self.send_error(HTTPStatus.LENGTH_REQUIRED)
+
+        bundle_service = self.server.bundle_service
+        body = RequestBody(self.rfile, int(self.headers['Content-Length']))
+        try:
+            # Zip archives are read from their end, so the body is spooled to the workspace first
+            bundle_service.assets_dir.mkdir(parents=True, exist_ok=True)
+            with tempfile.TemporaryFile(dir=bundle_service.assets_dir) as archive:
+                shutil.copyfileobj(body, archive, 1024 * 1024)
+                bundle_id, files, new_assets = bundle_service.store_archive(archive)
+        except ValueError as e:
+            return self.send_error(HTTPStatus.BAD_REQUEST, f'Invalid bundle: {e}')
+
+        self.send_json(HTTPStatus.CREATED, {
+            'bundle': bundle_id,
+            'blend_files': sorted(path for path in files if path.endswith('.blend')),
+            'files': len(files),
+            'new_assets': new_assets,
+        })
+
+    def upload_asset(self, asset_id: str):
+        """Store a single bundle file under its sha256, as listed by a bundle manifest."""
+        if 'Content-Length' not in self.headers:
+            return self.send_error(HTTPStatus.LENGTH_REQUIRED)
+
+        body = RequestBody(self.rfile, int(self.headers['Content-Length']))
+        try:
+            _, created = self.server.bundle_service.store_asset(body, expected_id=asset_id)
+        except ValueError as e:
+            return self.send_error(HTTPStatus.BAD_REQUEST, str(e))
+        self.send_json(HTTPStatus.CREATED if created else HTTPStatus.OK, {'asset': asset_id})
+
+    def create_bundle(self):
+        """
+        Create a bundle from a manifest of relative paths and sha256 hashes, e.g.
+        {"files": {"scene.blend": "<sha256>", "textures/wood.png": "<sha256>"}}
+        Responds 409 with the missing hashes until each was uploaded with PUT /api/assets/<sha256>,
+        so only changed files are ever transferred.
+        """
+        try:
+            request = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))))
+            files = dict(request['files'])
+            bundle_id = self.server.bundle_service.store_manifest(files)
+        except FileNotFoundError:
+            missing = self.server.bundle_service.get_missing_assets(list(files.values()))
+            return self.send_json(HTTPStatus.CONFLICT, {'missing': missing})
+        except (AttributeError, KeyError, TypeError, ValueError) as e:
+            return self.send_error(HTTPStatus.BAD_REQUEST, f'Invalid bundle request: {e}')
+
+        self.send_json(HTTPStatus.CREATED, {'bundle': bundle_id})
+
+    def submit_batch(self):
+        """
+        Create a batch of jobs from one stored source, e.g.
+        {"name": "lookdev", "source": "<sha256>/scene.blend", "mode": "still", "frame_range": "1",
+         "overrides": [{"camera": "CamA"}, {"camera": "CamB"}], "matrix": {"samples": [64, 128]}}
+        For a project bundle, pass {"bundle": "<bundle id>"} and optionally the main .blend as "source".
+        """
+        try:
+            request = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))))
+            batch_service = self.server.batch_service
+            bundle_files = None
+            if 'bundle' in request:
+                bundle_files = self.server.bundle_service.resolve_bundle(request['bundle'])
+                source_path = Path(self.server.bundle_service.find_main_file(bundle_files, request.get('source')))
+            else:
+                source_path = self.server.workspace_service.resolve_source(request['source'])
+            mode = batch_service.parse_mode(request.get('mode', 'still'))
+            variations = batch_service.expand_variations(request.get('overrides'), request.get('matrix'))
+            jobs = batch_service.submit(
+                request['name'],
+                source_path,
+                mode,
+                str(request.get('frame_range', '1')),
+                variations,
+                bundle_files,
+            )
+        except FileNotFoundError as e:
+            return self.send_error(HTTPStatus.NOT_FOUND, str(e))
+        except (AttributeError, KeyError, TypeError, ValueError) as e:
+            return self.send_error(HTTPStatus.BAD_REQUEST, f'Invalid batch request: {e}')
+
+        self.send_json(HTTPStatus.CREATED, {'job_ids': [job.id for job in jobs]})
+
+    def get_job(self, job_id: int):
+        """Look up a job that was not deleted, sending a 404 response otherwise."""
+        job = self.server.db_service.get_job(job_id)
+        if job is None or job.deleted_at is not None:
+            self.send_error(HTTPStatus.NOT_FOUND, f'Job {job_id} not found')
+            return None
+        return job
+
+    def download_source(self, job_id: int):
+        """Stream a job's source file."""
+        job = self.get_job(job_id)
+        if job is None:
+            return
+
+        source_file = self.server.workspace_service.parse_job_directory(job) / 'src' / job.source_file
+        if not source_file.is_file():
+            return self.send_error(HTTPStatus.NOT_FOUND, f'Source {job.source_file} does not exist')
+
+        self.send_file(source_file, 'application/octet-stream', attachment=True)
+
+    def download_output(self, job_id: int, path: str, attachment: bool):
+        """Stream a render output, preview, HLS segment or contact sheet of a job, e.g. static/000001.jpg."""
+        job = self.get_job(job_id)
+        if job is None:
+            return
+
+        job_dir = self.server.workspace_service.parse_job_directory(job).resolve()
+        output_file = (job_dir / path).resolve()
+        # Empty for the job directory itself, e.g. static/..
+        parts = output_file.relative_to(job_dir).parts if output_file.is_relative_to(job_dir) else ()
+        if not parts or parts[0] not in OUTPUT_DIRS or not output_file.is_file():
+            return self.send_error(HTTPStatus.NOT_FOUND, f'Output {path} does not exist')
+
+        content_type = OUTPUT_CONTENT_TYPES.get(output_file.suffix.lower()) or (
+            mimetypes.guess_type(output_file.name)[0] or 'application/octet-stream'
+        )
+        self.send_file(output_file, content_type, attachment)
+
+    def send_file(self, path: Path, content_type: str, attachment: bool = False):
+        """Stream a file, honouring a single byte range so browsers can seek in videos."""
+        size = path.stat().st_size
+        start, end = 0, size - 1
+
+        match = RANGE_HEADER.match(self.headers.get('Range', ''))
+        if match and (match.group('start') or match.group('end')):
+            if match.group('start'):
+                start = int(match.group('start'))
+                end = min(int(match.group('end') or end), end)
+            else:
+                # Suffix range: the last N bytes
+                start = max(0, size - int(match.group('end')))
+            if start > end:
+                self.send_response(HTTPStatus.REQUESTED_RANGE_NOT_SATISFIABLE)
+                self.send_header('Content-Range', f'bytes */{size}')
+                self.send_header('Content-Length', '0')
+                return self.end_headers()
+            self.send_response(HTTPStatus.PARTIAL_CONTENT)
+            self.send_header('Content-Range', f'bytes {start}-{end}/{size}')
+        else:
+            self.send_response(HTTPStatus.OK)
+
+        filename = path.name.replace('"', '')
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(end - start + 1))
+        self.send_header('Accept-Ranges', 'bytes')
+        self.send_header('Content-Disposition', f'{"attachment" if attachment else "inline"}; filename="{filename}"')
+        self.end_headers()
+
+        try:
+            with open(path, 'rb') as f:
+                f.seek(start)
+                remaining = end - start + 1
+                while remaining > 0:
+                    chunk = f.read(min(1024 * 1024, remaining))
+                    if not chunk:
+                        break
+                    self.wfile.write(chunk)
+                    remaining -= len(chunk)
+        except (BrokenPipeError, ConnectionResetError):
+            print(f'Client disconnected during download of {path.name}')
+
+    def export_job(self, job_id: int, query: dict):
+        """Stream a ZIP of a job's outputs, optionally limited with ?frames=1..10,15."""
+        job = self.get_job(job_id)
+        if job is None:
+            return
+
+        frames = None
+        if 'frames' in query:
+            try:
+                frames = parse_frames(query['frames'][0])
+            except ValueError as e:
+                return self.send_error(HTTPStatus.BAD_REQUEST, str(e))
+
+        filename = f'{job.name}-{job.id}.zip'.replace('"', '')
+
+        # No Content-Length: the archive is streamed and the connection closed at the end
+        self.send_response(HTTPStatus.OK)
+        self.send_header('Content-Type', 'application/zip')
+        self.send_header('Content-Disposition', f'attachment; filename="{filename}"')
+        self.end_headers()
+
+        try:
+            self.server.export_service.write_zip(job, self.wfile, frames)
+        except (BrokenPipeError, ConnectionResetError):
+            print(f'Client disconnected during export of {job.name}-{job.id}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Blender on AWS render API")
+    parser.add_argument(
+        "-c",
+        "--config",
+        default="config.yaml",
+        help="Path to config file (default: config.yaml)",
+    )
+    args = parser.parse_args()
+
+    try:
+        config, workspace_service, db_service = initialize_runtime(args.config)
+    except StartupError as e:
+        sys.exit(f"API failed to start ({e.stage}): {e}")
+
+    manifest_service = ManifestService(workspace_service, db_service)
+
+    api_config = config.get('api', {})
+    server = ThreadingHTTPServer(
+        (api_config.get('host', '0.0.0.0'), int(api_config.get('port', 8502))),
+        ApiHandler,
+    )
+    # SHA-256 digests of the bearer tokens accepted from scripts and CI
+    server.token_hashes = [str(token_hash).lower() for token_hash in api_config.get('token_sha256') or []]
+    server.db_service = db_service
+    server.workspace_service = workspace_service
+    server.export_service = ExportService(manifest_service)
+    max_bundle_size = config['workspace'].get('max_bundle_size')
+    server.max_bundle_bytes = int(max_bundle_size) * 1024 * 1024 if max_bundle_size else None
+    max_batch_jobs = config['workspace'].get('max_batch_jobs', 1000)
+    server.batch_service = BatchService(
+        workspace_service,
+        db_service,
+        max_batch_jobs=int(max_batch_jobs) if max_batch_jobs else None,
+        max_bundle_bytes=server.max_bundle_bytes,
+    )
+    server.bundle_service = BundleService(workspace_service, max_bundle_bytes=server.max_bundle_bytes)
+    server.metrics_service = MetricsService(
+        workspace_service, db_service, config.get('metrics', {}), get_worker_dead_after(config.get('worker', {}))
+    )
+
+    print(f'Serving API on {server.server_address[0]}:{server.server_address[1]}')
+    server.serve_forever()
@@ -1,5 +1,6 @@
+import sys
+
 import yaml
-import streamlit as st
 from typing import Dict, Optional
 
 class ConfigLoader:
@@ -20,5 +21,5 @@ class ConfigLoader:
             with open(config_path, 'r') as f:
                 return yaml.safe_load(f)
         except Exception as e:
-            st.error(f"Error loading config file: {e}")
+            print(f"Error loading config file: {e}", file=sys.stderr)
             return None
@@ -1,7 +1,17 @@
+import json
+import math
+from datetime import datetime, timezone
+from urllib.parse import quote
+
 import streamlit as st
+import streamlit.components.v1 as components
 import pandas as pd
 
-from blender_on_aws.models.job import RenderMode
+from blender_on_aws.models.db import get_worker_dead_after
+from blender_on_aws.models.job import CONTACT_SHEET_LEVELS, RenderMode
+from blender_on_aws.services.bundle_service import BundleService
+from blender_on_aws.services.log_service import LogService
+from blender_on_aws.services.manifest_service import ManifestService
 from blender_on_aws.utils.styles import get_common_styles
 from blender_on_aws.utils.config_init import initialize_app
 
@@ -14,8 +24,111 @@ st.set_page_config(
 if "is_rendering" not in st.session_state:
     st.session_state.is_rendering = False
 
+
+
+@st.cache_resource
+def load_services():
+    """Load config and construct services once per process instead of once per rerun."""
+    config, workspace_service, db_service = initialize_app()
+    max_bundle_size = config["workspace"].get("max_bundle_size")
+    return (
+        config,
+        workspace_service,
+        db_service,
+        ManifestService(workspace_service, db_service),
+        LogService(workspace_service),
+        BundleService(workspace_service, max_bundle_bytes=max_bundle_size * 1024 * 1024 if max_bundle_size else None),
+    )
+
+
+def sync_jobs() -> set:
+    """Merge jobs changed since the last poll into the session's job cache.
+
+    Returns:
+        set: IDs of the jobs that changed
+    """
+    jobs = st.session_state.setdefault("jobs", {})
+    revision = st.session_state.get("jobs_revision")
+
+    # Rows that vanished without passing through a deletion mark force a full reload
+    if revision is not None and len(jobs) != db_service.count_jobs():
+        jobs.clear()
+        revision = None
+
+    changed = db_service.get_jobs_changed_since(revision)
+    for job in changed:
+        if job.deleted_at is None:
+            jobs[job.id] = job
+        else:
+            jobs.pop(job.id, None)
+
+    if changed or revision is None:
+        st.session_state.jobs_revision = max(
+            [job.revision for job in changed if job.revision is not None], default=revision or 0
+        )
+        st.session_state.jobs_df = pd.DataFrame(
+            [
+                {
+                    "Id": job.id,
+                    "Job Name": job.name,
+                    "Created At": job.created_at,
+                    "Source": job.source_file,
+                    "Overrides": job.overrides,
+                    "Status": job.status,
+                }
+                for job in sorted(jobs.values(), key=lambda job: job.created_at, reverse=True)
+            ]
+        )
+    return {job.id for job in changed}
+
+
+def output_url(job, path, download: bool = False) -> str:
+    """URL of a job file served by the render API, so the dashboard never reads outputs itself."""
+    relative_path = path.relative_to(workspace_service.parse_job_directory(job)).as_posix()
+    return f"{api_url}/jobs/{job.id}/files/{quote(relative_path)}" + ("?download=1" if download else "")
+
+
+def video_player(video_url: str, stream_url: str = None):
+    """Play a job's HLS stream with hls.js (natively where supported), falling back to the MP4."""
+    # hls.js is only loaded with a pinned integrity hash, the dashboard runs behind authentication
+    hls_js = (
+        f'<script src="{hls_js_url}" integrity="{hls_js_integrity}" crossorigin="anonymous"></script>'
+        if hls_js_url and hls_js_integrity
+        else ""
+    )
+    components.html(
+        f"""
+        <video id="player" controls preload="metadata" style="width: 100%; max-height: 100vh"
+               src="{video_url}"></video>
+        {hls_js}
+        <script>
+            const video = document.getElementById("player");
+            const streamUrl = {json.dumps(stream_url)};
+            if (streamUrl && video.canPlayType("application/vnd.apple.mpegurl")) {{
+                video.src = streamUrl;
+            }} else if (streamUrl && window.Hls && Hls.isSupported()) {{
+                const hls = new Hls();
+                hls.on(Hls.Events.ERROR, (event, data) => {{
+                    // Keep the MP4 when the renditions are gone or unreadable
+                    if (data.fatal) {{ hls.destroy(); video.src = {json.dumps(video_url)}; }}
+                }});
+                hls.loadSource(streamUrl);
+                hls.attachMedia(video);
+            }}
+        </script>
+        """,
+        height=video_player_height,
+    )
+
+
 # Initialize app and get config/workspace service
-config, workspace_service, db_service = initialize_app()
+config, workspace_service, db_service, manifest_service, log_service, bundle_service = load_services()
+refresh_seconds = config.get("ui", {}).get("refresh_seconds", 5)
+worker_dead_after = get_worker_dead_after(config.get("worker", {}))
+api_url = config.get("api", {}).get("public_url", "/api")
+hls_js_url = config.get("ui", {}).get("hls_js_url", "https://cdn.jsdelivr.net/npm/hls.js@1.5.20/dist/hls.min.js")
+hls_js_integrity = config.get("ui", {}).get("hls_js_integrity")
+video_player_height = int(config.get("ui", {}).get("video_player_height", 260))
 
 # Add custom CSS
 st.markdown(get_common_styles(), unsafe_allow_html=True)
@@ -66,7 +179,38 @@ with cols[0]:
                 )
 
         st.subheader("📤 Upload Your File")
-        uploaded_file = st.file_uploader("Choose a .blend file", type=["blend"])
+        uploaded_file = st.file_uploader(
+            "Choose a .blend file, or a zip/tar archive of a project directory with its textures and libraries",
+            type=["blend", "zip", "tar", "tgz", "gz", "xz", "bz2"],
+        )
+
+        bundle_files = None
+        main_file = None
+        if uploaded_file and not uploaded_file.name.endswith(".blend"):
+            # Store the archive once per upload, unchanged assets are already in the cache
+            bundle = st.session_state.get("bundle")
+            if bundle is None or bundle[0] != uploaded_file.file_id:
+                try:
+                    with st.spinner("Storing project files..."):
+                        _, files, new_assets = bundle_service.store_archive(uploaded_file)
+                    bundle = st.session_state.bundle = (uploaded_file.file_id, files, new_assets)
+                except ValueError as e:
+                    st.error(f"Invalid project archive: {e}")
+                    bundle = None
+            if bundle:
+                _, bundle_files, new_assets = bundle
+                st.caption(f"{new_assets} new of {len(bundle_files)} project files stored")
+                blend_files = sorted(path for path in bundle_files if path.endswith(".blend"))
+                if blend_files:
+                    try:
+                        default_file = bundle_service.find_main_file(bundle_files)
+                    except ValueError:
+                        default_file = blend_files[0]
+                    main_file = st.selectbox(
+                        "Main .blend file", blend_files, index=blend_files.index(default_file)
+                    )
+                else:
+                    st.error("The archive contains no .blend file")
 
         if uploaded_file:
             # Validate inputs
@@ -75,6 +219,11 @@ with cols[0]:
                 st.error("Please enter a job name")
                 is_valid = False
 
+            if bundle_files is not None and main_file is None:
+                is_valid = False
+            elif not uploaded_file.name.endswith(".blend") and bundle_files is None:
+                is_valid = False
+
             if render_mode == RenderMode.still:
                 if not frame_range:
                     st.error("Please enter frame range")
@@ -113,18 +262,38 @@ with cols[0]:
                             else str(start_frame)
                         )
 
-                    # Create job entry
-                    job = db_service.create_job(
-                        job_name,
-                        frame_range,
-                        mode=render_mode,
-                        source_file=uploaded_file.name,
-                    )
+                    if bundle_files is not None:
+                        # The job stays pending until its project files are linked into the job directory
+                        job = db_service.create_jobs(
+                            [{
+                                "name": job_name,
+                                "frame_range": frame_range,
+                                "mode": render_mode,
+                                "source_file": main_file,
+                            }],
+                            status="pending",
+                        )[0]
+                        try:
+                            bundle_service.link_job_bundle(job, bundle_files)
+                            db_service.update_job(job.id, status="queued")
+                        except FileNotFoundError:
+                            db_service.mark_job_deleted(job.id)
+                            st.session_state.pop("bundle", None)
+                            st.error("Project files expired from the cache, please upload the archive again")
+                            st.stop()
+                    else:
+                        # Create job entry
+                        job = db_service.create_job(
+                            job_name,
+                            frame_range,
+                            mode=render_mode,
+                            source_file=uploaded_file.name,
+                        )
 
-                    # Create job directory
-                    job_dir = workspace_service.create_job_directory(
-                        job, uploaded_file.getvalue(), uploaded_file.name
-                    )
+                        # Create job directory
+                        job_dir = workspace_service.create_job_directory(
+                            job, uploaded_file.getvalue(), uploaded_file.name
+                        )
 
                     st.info("Job submitted")
 
@@ -142,40 +311,62 @@ with cols[1]:
         unsafe_allow_html=True,
     )
 
-    jobs = db_service.get_all_jobs()
+    @st.fragment(run_every=refresh_seconds)
+    def job_list():
+        changed = sync_jobs()
+        df = st.session_state.jobs_df
+
+        if len(df):
+            event = st.dataframe(
+                df,
+                on_select="rerun",
+                selection_mode="single-row",
+                hide_index=True,
+                # Row positions shift when the list changes, so reset the selection with it
+                key=f"queued-jobs-{st.session_state.jobs_revision}",
+            )
+            selected_job = st.session_state.get("selected_job")
+            if len(event.selection.get("rows")) > 0:
+                selected_row = event.selection.get("rows")[0]
+                st.session_state.selected_job = int(df.iloc[selected_row]["Id"])
 
-    if jobs:
-        df = pd.DataFrame(
-            [
-                {
-                    "Id": job.id,
-                    "Job Name": job.name,
-                    "Created At": job.created_at,
-                    "Source": job.source_file,
-                    "Status": job.status,
-                }
-                for job in jobs
-            ]
-        )
-        event = st.dataframe(
-            df,
-            on_select="rerun",
-            selection_mode="single-row",
-            hide_index=True,
-            key="queued-jobs",
-        )
-        if len(event.selection.get("rows")) > 0:
-            selected_row = event.selection.get("rows")[0]
-            st.session_state.selected_job = df.iloc[selected_row]["Id"]
-    else:
-        st.markdown(
-            """
-            <div class="empty-placeholder">
-                <p>No Jobs</p>
-            </div>
-            """,
-            unsafe_allow_html=True,
-        )
+            # Redraw the detail panel when another job is selected or the selected job changed
+            if st.session_state.get("selected_job") != selected_job or selected_job in changed:
+                st.rerun()
+        else:
+            st.markdown(
+                """
+                <div class="empty-placeholder">
+                    <p>No Jobs</p>
+                </div>
+                """,
+                unsafe_allow_html=True,
+            )
+
+        st.markdown("#### 🖥️ Workers")
+        workers = db_service.get_workers()
+        if workers:
+            now = datetime.now(timezone.utc)
+            st.dataframe(
+                pd.DataFrame(
+                    [
+                        {
+                            "Worker": worker.id,
+                            "Status": "🟢 live"
+                            if now - worker.last_heartbeat.replace(tzinfo=timezone.utc) < worker_dead_after
+                            else "🔴 dead",
+                            "Job": worker.current_job_id,
+                            "Last Heartbeat": worker.last_heartbeat,
+                        }
+                        for worker in workers
+                    ]
+                ),
+                hide_index=True,
+            )
+        else:
+            st.caption("No workers have reported yet")
+
+    job_list()
 
 with cols[2]:
     st.title("🔍 Job Detail")
@@ -191,99 +382,177 @@ with cols[2]:
             unsafe_allow_html=True,
         )
     else:
-        selected_job_id = st.session_state.selected_job
-        job = db_service.get_job(int(selected_job_id))
-
-        print(f"Got {job}")
-
-        job_dir = workspace_service.parse_job_directory(job)
-        # Create two columns for job details
-        col1, col2 = st.columns(2)
-
-        with col1:
-            st.markdown("**Job ID:**")
-            st.markdown("**Job ID:**")
-            st.markdown("**Status:**")
-            st.markdown("**Render Time:**")
-            st.markdown("**Mode:**")
-            st.markdown("**Frame Range:**")
-            st.markdown("**Source File:**")
-
-        with col2:
-            st.markdown(f"`{job.id}`")
-            st.markdown(f"`{job.name}`")
-            st.markdown(f"`{job.status}`")
-
-            if job.status == 'complete':
-                render_time = job.finished_at - job.created_at
-                minutes = int(render_time.total_seconds() // 60)
-                seconds = int(render_time.total_seconds() % 60)
-                st.markdown(f"`{minutes}m {seconds}s`")
-            else:
-                st.markdown("`-`")
-
-            st.markdown(f"`{job.mode}`")
-            st.markdown(f"`{job.frame_range}`")
-
-            src_file_path = job_dir.absolute() / "src" / str(job.source_file)
-
-            if src_file_path.exists():
-                with open(job_dir.absolute() / "src" / job.source_file, "rb") as f:
-                    st.download_button(
-                        job.source_file,
-                        f,
-                        job.source_file,
-                        mime="application/octet-stream",
+        def job_detail(selected_job_id: int):
+            job = db_service.get_job(selected_job_id)
+            if job is None or job.deleted_at is not None:
+                st.warning("This job no longer exists")
+                return
+
+            job_dir = workspace_service.parse_job_directory(job)
+            # Create two columns for job details
+            col1, col2 = st.columns(2)
+
+            with col1:
+                st.markdown("**Job ID:**")
+                st.markdown("**Job Name:**")
+                st.markdown("**Status:**")
+                st.markdown("**Render Time:**")
+                st.markdown("**Mode:**")
+                st.markdown("**Frame Range:**")
+                st.markdown("**Overrides:**")
+                st.markdown("**Storage:**")
+                st.markdown("**Source File:**")
+
+            with col2:
+                st.markdown(f"`{job.id}`")
+                st.markdown(f"`{job.name}`")
+                st.markdown(f"`{job.status}` ({job.attempts or 0} attempts)")
+
+                if job.status == 'complete':
+                    render_time = job.finished_at - job.created_at
+                    minutes = int(render_time.total_seconds() // 60)
+                    seconds = int(render_time.total_seconds() % 60)
+                    st.markdown(f"`{minutes}m {seconds}s`")
+                else:
+                    st.markdown("`-`")
+
+                st.markdown(f"`{job.mode}`")
+                st.markdown(f"`{job.frame_range}`")
+
+                st.markdown(f"`{job.overrides or '-'}`")
+
+                if job.storage_bytes is not None:
+                    st.markdown(f"`{job.storage_bytes / 1024 ** 2:,.1f} MB`")
+                else:
+                    st.markdown("`-`")
+
+                src_file_path = job_dir.absolute() / "src" / str(job.source_file)
+
+                if src_file_path.exists():
+                    # Streamed by the render API instead of being read into every rerun
+                    st.link_button(job.source_file, f"{api_url}/jobs/{job.id}/source")
+                else:
+                    st.warning(f'Source {job.source_file} does not exist')
+
+            if job.last_error and job.status != "complete":
+                st.error(f"Last error: {job.last_error}")
+
+            # Follow the job's render log, only the bytes appended since the last poll are read
+            if st.toggle("📜 Show log", key=f"show-log-{job.id}"):
+                log_state = st.session_state.setdefault(f"log-{job.id}", {"text": "", "offset": None, "inode": None})
+                text, offset, inode = log_service.tail(job, log_state["offset"], log_state["inode"])
+                if inode != log_state["inode"] or (log_state["offset"] or 0) > offset:
+                    log_state["text"] = ""
+                log_state.update(
+                    # Keep the last 64KB on screen
+                    text=(log_state["text"] + text)[-64 * 1024:],
+                    offset=offset,
+                    inode=inode,
+                )
+                if log_state["text"]:
+                    st.code(log_state["text"], language=None)
+                else:
+                    st.caption("No log output yet")
+
+            # Add delete button
+            if st.button("🗑️ Delete Job", type="primary", use_container_width=True):
+                # Mark the job deleted, the janitor reclaims its workspace in the background
+                if db_service.mark_job_deleted(job.id):
+                    st.success("Job deleted successfully")
+                    # Clear selected job from session state
+                    del st.session_state.selected_job
+                    st.rerun()
+                else:
+                    st.error("Failed to delete job")
+
+            # Display render outputs
+            st.markdown("### 🎬 Render Outputs")
+
+            output_count = manifest_service.count_outputs(job)
+
+            # Download everything as a single ZIP streamed by the render API
+            if output_count:
+                export_cols = st.columns([2, 1], vertical_alignment="bottom")
+                with export_cols[0]:
+                    export_frames = st.text_input(
+                        "Export Frames",
+                        placeholder="All frames, or e.g. 1..100 or 1,2,3",
+                        key=f"export-frames-{job.id}",
                     )
-            else:
-                st.warning(f'Source {job.source_file} does not exist')
-
-        # Add delete button
-        if st.button("🗑️ Delete Job", type="primary", use_container_width=True):
-            # Delete job from workspace and database
-            if workspace_service.delete_job(job) and db_service.delete_job(job.id):
-                st.success("Job deleted successfully")
-                # Clear selected job from session state
-                del st.session_state.selected_job
-                st.rerun()
-            else:
-                st.error("Failed to delete job")
-
-        # Display render outputs
-        st.markdown("### 🎬 Render Outputs")
-
-        output_cols = st.columns(2)
-
-        render_pairs = workspace_service.get_output_files(job)
-        # Display compressed JPGs with PNG download links
-        for idx, (render_file, static_file) in enumerate(render_pairs):
-            with output_cols[idx % 2]:  # Distribute across 3 columns
-                if job.mode == RenderMode.still:
-                    # Display compressed JPG
-                    st.image(
-                        str(static_file),
-                        caption=render_file.name,  # Show original PNG name
-                        use_container_width=True,
+                with export_cols[1]:
+                    export_url = f"{api_url}/jobs/{job.id}/export.zip"
+                    if export_frames:
+                        export_url += f"?frames={quote(export_frames)}"
+                    st.link_button("📦 Download All", export_url, use_container_width=True)
+            page_size = workspace_service.items_per_page
+            page_count = max(1, math.ceil(output_count / page_size))
+
+            # Contact sheets let you scrub a whole still batch from a handful of images
+            if job.mode == RenderMode.still and output_count > page_size:
+                if st.toggle("Show contact sheets", key=f"contact-sheets-{job.id}"):
+                    tile_width = st.select_slider(
+                        "Zoom",
+                        options=sorted(CONTACT_SHEET_LEVELS),
+                        value=max(CONTACT_SHEET_LEVELS),
+                        key=f"contact-sheet-zoom-{job.id}",
                     )
-                    # Provide download link for original PNG
-                    if render_file.exists():
-                        with open(render_file, "rb") as f:
-                            st.download_button(
-                                f"Download {render_file.name}",
-                                f,
-                                file_name=render_file.name,
-                                mime="image/png",
-                            )
-                else:
-                    st.video(
-                        str(static_file),
+                    frames_per_sheet = CONTACT_SHEET_LEVELS[tile_width] ** 2
+                    sheet_count = math.ceil(output_count / frames_per_sheet)
+                    sheet = st.number_input(
+                        f"Sheet (of {sheet_count})",
+                        min_value=1,
+                        max_value=sheet_count,
+                        value=1,
+                        key=f"contact-sheet-{job.id}-{tile_width}",
                     )
-                    if static_file.exists():
-                        # Add download button for the video
-                        with open(static_file, "rb") as f:
-                            st.download_button(
-                                f"Download {static_file.name}",
-                                f,
-                                file_name=static_file.name,
-                                mime="video/mp4",
-                            )
+                    sheet_file = workspace_service.get_contact_sheet(job, tile_width, sheet - 1)
+                    if sheet_file.exists():
+                        first_output = (sheet - 1) * frames_per_sheet + 1
+                        last_output = min(sheet * frames_per_sheet, output_count)
+                        st.html(f'<img src="{output_url(job, sheet_file)}" style="width: 100%">')
+                        st.caption(f"Outputs {first_output}-{last_output} of {output_count}")
+                    else:
+                        st.info("Contact sheets are not available for this job")
+
+            # Only load the outputs of the current page
+            page = 1
+            if page_count > 1:
+                page = st.number_input(
+                    f"Page (of {page_count})",
+                    min_value=1,
+                    max_value=page_count,
+                    value=1,
+                    key=f"output-page-{job.id}",
+                )
+
+            output_cols = st.columns(2)
+
+            render_pairs = manifest_service.get_outputs(
+                job, offset=(page - 1) * page_size, limit=page_size
+            )
+            # Display compressed JPGs with PNG download links. Files are streamed by the render API,
+            # the panel refreshes while a job renders and must not read outputs on every run
+            for idx, (render_file, static_file, preview_file) in enumerate(render_pairs):
+                with output_cols[idx % 2]:  # Distribute across 2 columns
+                    if job.mode == RenderMode.still:
+                        # Display compressed JPG
+                        st.html(f'<img src="{output_url(job, static_file)}" style="width: 100%">')
+                        st.caption(render_file.name)  # Show original PNG name
+                        # Provide download link for original PNG
+                        st.link_button(f"Download {render_file.name}", output_url(job, render_file, download=True))
+                    else:
+                        # Stream the adaptive HLS renditions while they exist, the janitor drops them
+                        # after drop_intermediates_after_days and the low-bitrate proxy plays instead
+                        stream_file = workspace_service.parse_job_directory(job) / "stream" / "master.m3u8"
+                        video_player(
+                            output_url(job, preview_file or static_file),
+                            output_url(job, stream_file) if stream_file.exists() else None,
+                        )
+                        st.link_button(f"Download {static_file.name}", output_url(job, static_file, download=True))
+
+        # Keep polling while the job renders so status and new outputs show up
+        selected_job = st.session_state.get("jobs", {}).get(st.session_state.selected_job)
+        is_active = selected_job is not None and selected_job.status not in ("complete", "failed")
+        st.fragment(job_detail, run_every=refresh_seconds if is_active else None)(
+            st.session_state.selected_job
+        )
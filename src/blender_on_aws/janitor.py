@@ -0,0 +1,32 @@
+import argparse
+import sys
+
+from blender_on_aws.utils.runtime import StartupError, initialize_runtime
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Blender on AWS workspace janitor")
+    parser.add_argument(
+        "-c",
+        "--config",
+        default="config.yaml",
+        help="Path to config file (default: config.yaml)",
+    )
+    args = parser.parse_args()
+
+    try:
+        config, workspace_service, db_service = initialize_runtime(args.config)
+    except StartupError as e:
+        sys.exit(f"Janitor failed to start ({e.stage}): {e}")
+
+    from blender_on_aws.models.db import get_worker_dead_after
+    from blender_on_aws.services.metrics_service import MetricsService
+    from blender_on_aws.workers.janitor_worker import JanitorWorker
+
+    dead_after = get_worker_dead_after(config.get('worker', {}))
+    metrics_service = MetricsService(workspace_service, db_service, config.get('metrics', {}), dead_after)
+    janitor_worker = JanitorWorker(workspace_service, db_service, config.get('retention', {}), metrics_service)
+
+    print('Starting Janitor...')
+
+    janitor_worker.run()
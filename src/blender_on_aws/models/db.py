@@ -1,21 +1,100 @@
-from datetime import datetime
-from sqlalchemy import Column, String, DateTime, Integer
+from datetime import datetime, timedelta
+from typing import Dict
+from sqlalchemy import Column, String, DateTime, Integer, ForeignKey
 from sqlalchemy.ext.declarative import declarative_base
 from datetime import timezone
 
 Base = declarative_base()
 
+# Change sequence: every insert or update of a job takes the next revision number from the
+# one-row job_revisions counter, so pollers can fetch only jobs changed since the last revision
+# they saw. The counter lives outside the jobs table, so deleting rows never rewinds it.
+JOB_REVISION_TRIGGERS = [
+    f"""
+    CREATE TRIGGER IF NOT EXISTS jobs_revision_after_{event.lower()}
+    AFTER {event} ON jobs
+    BEGIN
+        UPDATE job_revisions SET revision = revision + 1 WHERE id = 1;
+        UPDATE jobs SET revision = (SELECT revision FROM job_revisions WHERE id = 1) WHERE id = NEW.id;
+    END
+    """
+    for event in ('INSERT', 'UPDATE')
+]
+
 class Job(Base):
     __tablename__ = 'jobs'
+    # Ids of reclaimed jobs are never reused, so late writes cannot land on a new job
+    __table_args__ = {'sqlite_autoincrement': True}
 
     id = Column(Integer, primary_key=True, autoincrement=True)
     name = Column(String, nullable=False)
     created_at = Column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc), nullable=False)
     finished_at = Column(DateTime(timezone=True), nullable=True)
+    # Start of the latest attempt, finished_at - started_at is the job's render time
+    started_at = Column(DateTime(timezone=True), nullable=True)
     frame_range = Column(String, nullable=False)
     mode = Column(String, nullable=False)
     source_file = Column(String, nullable=False)
+    overrides = Column(String, nullable=True)
     status = Column(String, default='complete', nullable=False)
+    deleted_at = Column(DateTime(timezone=True), nullable=True)
+    storage_bytes = Column(Integer, nullable=True)
+    # Frames an animation actually rendered, known once a job without an end frame completed
+    rendered_frames = Column(Integer, nullable=True)
+    # Set by JOB_REVISION_TRIGGERS
+    revision = Column(Integer, index=True, nullable=True)
+    attempts = Column(Integer, default=0, nullable=True)
+    last_error = Column(String, nullable=True)
+    worker_id = Column(String, nullable=True)
 
     def __repr__(self):
         return f"<Job(job_id='{self.id}', job_name='{self.name}' created_at='{self.created_at} finished_at='{self.finished_at}' status={self.status})>"
+
+
+class JobRevision(Base):
+    __tablename__ = 'job_revisions'
+
+    id = Column(Integer, primary_key=True)
+    revision = Column(Integer, nullable=False)
+
+
+class JobOutput(Base):
+    __tablename__ = 'job_outputs'
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    job_id = Column(Integer, ForeignKey('jobs.id'), index=True, nullable=False)
+    render_file = Column(String, nullable=False)
+    static_file = Column(String, nullable=False)
+    preview_file = Column(String, nullable=True)
+    size = Column(Integer, nullable=True)
+    width = Column(Integer, nullable=True)
+    height = Column(Integer, nullable=True)
+    checksum = Column(String, nullable=True)
+    created_at = Column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc), nullable=False)
+
+    def __repr__(self):
+        return f"<JobOutput(job_id='{self.job_id}', render_file='{self.render_file}' static_file='{self.static_file}' size={self.size})>"
+
+
+# Workers are considered dead, and their jobs orphaned, after missing this many heartbeats
+MISSED_HEARTBEATS = 4
+
+
+def get_worker_dead_after(worker_config: Dict) -> timedelta:
+    """Heartbeat age after which a worker is dead, from the `worker` section of the app config."""
+    return timedelta(seconds=float(worker_config.get('heartbeat_seconds', 30)) * MISSED_HEARTBEATS)
+
+
+class Worker(Base):
+    __tablename__ = 'workers'
+
+    id = Column(String, primary_key=True)
+    hostname = Column(String, nullable=False)
+    started_at = Column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc), nullable=False)
+    last_heartbeat = Column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc), nullable=False)
+    current_job_id = Column(Integer, nullable=True)
+    # Set when the worker last became idle, None while it renders
+    idle_since = Column(DateTime(timezone=True), nullable=True)
+
+    def __repr__(self):
+        return f"<Worker(worker_id='{self.id}', hostname='{self.hostname}' last_heartbeat='{self.last_heartbeat}' current_job_id={self.current_job_id})>"
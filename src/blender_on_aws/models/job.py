@@ -4,3 +4,22 @@ from enum import StrEnum
 class RenderMode(StrEnum):
     still = "Still Frame"
     anim = "Animation"
+
+
+# Scene settings a job may override, applied by scripts/overrides.py
+# (frame_range replaces the job's frame range instead)
+OVERRIDE_KEYS = {
+    "camera",
+    "samples",
+    "resolution_x",
+    "resolution_y",
+    "resolution_percentage",
+    "frame_range",
+}
+
+# Contact sheet zoom levels: thumbnail width (px) -> tiles per row/column
+CONTACT_SHEET_LEVELS = {
+    256: 4,
+    128: 8,
+    64: 16,
+}
@@ -0,0 +1,38 @@
+import argparse
+import sys
+
+from blender_on_aws.services.manifest_service import ManifestService
+from blender_on_aws.utils.runtime import StartupError, initialize_runtime
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rebuild job output manifests from the workspace")
+    parser.add_argument(
+        "-c",
+        "--config",
+        default="config.yaml",
+        help="Path to config file (default: config.yaml)",
+    )
+    parser.add_argument(
+        "-j",
+        "--job",
+        type=int,
+        action="append",
+        help="ID of a job to repair (repeatable, default: all jobs)",
+    )
+    args = parser.parse_args()
+
+    try:
+        config, workspace_service, db_service = initialize_runtime(args.config)
+    except StartupError as e:
+        sys.exit(f"Manifest repair failed to start ({e.stage}): {e}")
+
+    manifest_service = ManifestService(workspace_service, db_service)
+
+    jobs = [db_service.get_job(job_id) for job_id in args.job] if args.job else db_service.get_all_jobs()
+
+    for job in jobs:
+        if job is None:
+            continue
+        count = manifest_service.rebuild(job)
+        print(f'Rebuilt manifest for {job.name}-{job.id}: {count} outputs')
@@ -0,0 +1,158 @@
+from datetime import datetime, timezone
+from itertools import product
+from pathlib import Path
+from typing import Dict, List, Optional
+import json
+import math
+
+from blender_on_aws.models.db import Job
+from blender_on_aws.models.job import OVERRIDE_KEYS, RenderMode
+from blender_on_aws.services.bundle_service import BundleService
+from blender_on_aws.services.db_service import DatabaseService
+from blender_on_aws.services.workspace_service import WorkspaceService
+from blender_on_aws.utils.frames import parse_frames
+
+
+class BatchService:
+    """Service class to submit several jobs sharing one stored source file or project bundle."""
+
+    def __init__(
+        self,
+        workspace_service: WorkspaceService,
+        db_service: DatabaseService,
+        max_batch_jobs: Optional[int] = None,
+        max_bundle_bytes: Optional[int] = None,
+    ):
+        """
+        Initialize batch service.
+
+        Args:
+            workspace_service (WorkspaceService): Workspace service storing sources and job directories
+            db_service (DatabaseService): Database service creating the jobs
+            max_batch_jobs (Optional[int]): Limit on the jobs a single batch creates, None for no limit
+            max_bundle_bytes (Optional[int]): Limit on the size of a stored source or project bundle, None for no limit
+        """
+        self.workspace_service = workspace_service
+        self.db_service = db_service
+        self.max_batch_jobs = max_batch_jobs
+        self.max_bundle_bytes = max_bundle_bytes
+        self.bundle_service = BundleService(workspace_service, max_bundle_bytes=max_bundle_bytes)
+
+    @staticmethod
+    def parse_mode(mode: str) -> RenderMode:
+        """
+        Parse a render mode given by name (still, anim) or value (Still Frame, Animation).
+
+        Raises:
+            ValueError: If the mode is unknown
+        """
+        if mode in RenderMode.__members__:
+            return RenderMode[mode]
+        return RenderMode(mode)
+
+    @staticmethod
+    def validate_frame_range(mode: RenderMode, frame_range: str):
+        """
+        Validate a frame range for the given mode.
+
+        Raises:
+            ValueError: If the frame range is malformed
+        """
+        if mode == RenderMode.still:
+            parse_frames(frame_range)
+        else:
+            frames = [int(frame) for frame in frame_range.split('-')]
+            if len(frames) > 2 or frames[0] < 1 or frames != sorted(frames):
+                raise ValueError(f"Invalid animation frame range {frame_range}, use start or start-end")
+
+    def expand_variations(
+        self,
+        overrides: Optional[List[Dict]] = None,
+        matrix: Optional[Dict[str, List]] = None,
+    ) -> List[Dict]:
+        """
+        Expand explicit overrides and a parameter matrix into one override set per job.
+        Every explicit override set is combined with every point of the matrix.
+
+        Args:
+            overrides (Optional[List[Dict]]): Explicit override sets, e.g. [{"camera": "CamA"}]
+            matrix (Optional[Dict[str, List]]): Values to sweep per key, e.g. {"samples": [64, 128]}
+
+        Returns:
+            List[Dict]: Override sets, a single empty set if nothing was given
+
+        Raises:
+            ValueError: If an unknown override key is used or the batch exceeds max_batch_jobs
+        """
+        matrix = matrix or {}
+        keys = list(matrix)
+
+        # Checked before expanding, a few long sweeps multiply into millions of jobs
+        count = len(overrides or [{}]) * math.prod(len(matrix[key]) for key in keys)
+        if self.max_batch_jobs is not None and count > self.max_batch_jobs:
+            raise ValueError(f"Batch would create {count} jobs, the limit is {self.max_batch_jobs}")
+
+        sweep = [dict(zip(keys, values)) for values in product(*(matrix[key] for key in keys))]
+
+        variations = [{**base, **point} for base in (overrides or [{}]) for point in sweep]
+
+        unknown = {key for variation in variations for key in variation} - OVERRIDE_KEYS
+        if unknown:
+            raise ValueError(f"Unknown override keys: {', '.join(sorted(unknown))}")
+        return variations
+
+    def submit(
+        self,
+        name: str,
+        source_path: Path,
+        mode: RenderMode,
+        frame_range: str,
+        variations: List[Dict],
+        bundle_files: Optional[Dict[str, str]] = None,
+    ) -> List[Job]:
+        """
+        Create one job per variation in a single transaction, all linked to the same stored source.
+
+        Args:
+            name (str): Job name shared by the batch
+            source_path (Path): Stored source file (see WorkspaceService.store_source), or the main
+                .blend relative to the bundle root when bundle_files is given
+            mode (RenderMode): Render mode
+            frame_range (str): Default frame range, a variation may override it with frame_range
+            variations (List[Dict]): Override sets, one per job
+            bundle_files (Optional[Dict[str, str]]): Files of a project bundle (see BundleService.resolve_bundle)
+
+        Returns:
+            List[Job]: Created jobs
+
+        Raises:
+            ValueError: If a frame range is invalid
+            FileNotFoundError: If the stored source or a bundle asset was removed in the meantime
+        """
+        specs = []
+        for variation in variations:
+            variation = dict(variation)
+            job_frame_range = str(variation.pop('frame_range', frame_range))
+            self.validate_frame_range(mode, job_frame_range)
+            specs.append({
+                'name': name,
+                'frame_range': job_frame_range,
+                'mode': mode,
+                'source_file': source_path.as_posix() if bundle_files else source_path.name,
+                'overrides': json.dumps(variation) if variation else None,
+            })
+
+        # Jobs stay pending until every job directory exists, so workers never see a missing source
+        jobs = self.db_service.create_jobs(specs, status='pending')
+        try:
+            for job in jobs:
+                if bundle_files:
+                    self.bundle_service.link_job_bundle(job, bundle_files)
+                else:
+                    self.workspace_service.link_job_source(job, source_path)
+        except OSError:
+            # Never release jobs with an incomplete source, the janitor reclaims them instead
+            self.db_service.update_jobs([job.id for job in jobs], deleted_at=datetime.now(timezone.utc))
+            raise
+        self.db_service.update_jobs([job.id for job in jobs], status='queued')
+        return jobs
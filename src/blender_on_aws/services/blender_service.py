@@ -1,31 +1,148 @@
 from pathlib import Path
-from typing import List, Tuple
+from typing import Callable, List, Optional, Tuple
+import logging
+import os
 import subprocess
+import threading
+import time
 from blender_on_aws.services.ffmpeg_service import FFmpegService
 from blender_on_aws.models.db import Job
 from blender_on_aws.models.job import RenderMode
 
+logger = logging.getLogger("blender_on_aws.render.blender")
+
+
+class RenderStalledError(Exception):
+    """Raised when a render process makes no progress for longer than the stall timeout."""
+
+
+class RenderCancelledError(Exception):
+    """Raised when a render is cancelled, e.g. because its job was deleted."""
+
 
 class BlenderService:
     """Service class to handle Blender-related operations."""
     
-    def __init__(self, workspace_root: Path):
+    def __init__(
+        self,
+        workspace_root: Path,
+        stall_timeout: Optional[float] = None,
+        poll_interval: float = 10,
+        ffmpeg_timeout: Optional[float] = None,
+    ):
         """
         Initialize blender service.
         
         Args:
             workspace_root (Path): Path to workspace root directory
+            stall_timeout (Optional[float]): Seconds without output or new frames before a render is killed, None to wait forever
+            poll_interval (float): Seconds between watchdog checks
+            ffmpeg_timeout (Optional[float]): Timeout in seconds for each ffmpeg call, None to wait forever
         """
         self.workspace_root = workspace_root
-        self.ffmpeg_service = FFmpegService()
+        self.stall_timeout = stall_timeout
+        self.poll_interval = poll_interval
+        self.ffmpeg_service = FFmpegService(timeout=ffmpeg_timeout)
+
+    @staticmethod
+    def _render_progress(render_dir: Path) -> Tuple[int, str, int]:
+        """
+        Snapshot of the render directory: number of files, and name and size of the newest one.
+        Outputs are numbered, so the newest file sorts last and only it is stat'ed, keeping the
+        watchdog to one directory listing per poll however many frames were rendered.
+        """
+        names = [entry.name for entry in os.scandir(render_dir)]
+        if not names:
+            return 0, '', 0
+        newest = max(names)
+        return len(names), newest, os.stat(render_dir / newest).st_size
+
+    def _run_watched(
+        self,
+        cmd: List[str],
+        render_dir: Path,
+        cancel: Optional[threading.Event] = None,
+    ) -> subprocess.CompletedProcess:
+        """
+        Run the render process under a watchdog.
+        Any output line or change in the render directory counts as progress.
         
-    def render_blend_file(self, job_dir: Path, job: Job) -> tuple[List[Tuple[Path, Path]], str, str]:
+        Args:
+            cmd: Command to run
+            render_dir: Directory the process renders into
+            cancel: Kills the process once set
+
+        Returns:
+            subprocess.CompletedProcess: Completed process (output is streamed, not captured)
+
+        Raises:
+            RenderStalledError: If the process made no progress for stall_timeout seconds
+            RenderCancelledError: If cancel was set
+            subprocess.CalledProcessError: If the process exited with a non-zero status
+        """
+        logger.info("$ " + " ".join(cmd))
+        # Output may contain file paths in any encoding, a decode error would stop draining the pipe
+        process = subprocess.Popen(
+            cmd,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            text=True,
+            errors='replace',
+            bufsize=1,
+        )
+        last_progress = time.monotonic()
+
+        def read_output():
+            nonlocal last_progress
+            for line in process.stdout:
+                logger.info(line.rstrip('\n'))
+                last_progress = time.monotonic()
+
+        reader = threading.Thread(target=read_output, daemon=True)
+        reader.start()
+
+        try:
+            progress = self._render_progress(render_dir)
+            while process.poll() is None:
+                time.sleep(self.poll_interval)
+
+                current = self._render_progress(render_dir)
+                if current != progress:
+                    progress = current
+                    last_progress = time.monotonic()
+
+                if self.stall_timeout is not None and time.monotonic() - last_progress > self.stall_timeout:
+                    raise RenderStalledError(f"No render progress for {self.stall_timeout:.0f}s, process killed")
+
+                if cancel is not None and cancel.is_set():
+                    raise RenderCancelledError("Render cancelled, process killed")
+        finally:
+            # Whatever stops the watchdog, the job is requeued or failed and must not keep rendering
+            if process.poll() is None:
+                process.kill()
+                process.wait()
+                reader.join(timeout=self.poll_interval)
+
+        reader.join()
+        if process.returncode != 0:
+            raise subprocess.CalledProcessError(process.returncode, cmd)
+        return subprocess.CompletedProcess(cmd, process.returncode)
+        
+    def render_blend_file(
+        self,
+        job_dir: Path,
+        job: Job,
+        on_output: Optional[Callable[..., None]] = None,
+        cancel: Optional[threading.Event] = None,
+    ) -> tuple[List[Tuple[Path, Path]], str, str]:
         """
         Create render directory and execute blender render command.
         
         Args:
             job_dir: Job directory
             job: Job definition
+            on_output: Called with each (render, static[, preview]) output as soon as it is produced
+            cancel: Kills the render process once set and stops post-processing
 
         Returns:
             tuple[List[Tuple[Path, Path]], str, str]: Tuple containing:
@@ -53,6 +170,9 @@ class BlenderService:
             "blender",
             "-b",  # background mode
             "-y",  # yes to all
+            # Exit with an error when a -P script raises (e.g. an override naming an unknown camera)
+            # instead of rendering the unmodified scene, must precede the scripts
+            "--python-exit-code", "1",
             str(blend_file),
             "-P", str(self.workspace_root / "scripts" / "cycles.py"),  # Run GPU setup script
             "--render-output", output_template,
@@ -68,8 +188,14 @@ class BlenderService:
             if len(frames) > 1:
                 cmd.extend(["-e", str(frames[1])])
             cmd.append("-a")
+
+        # Apply per-job scene overrides before rendering, passed to the script after "--"
+        if job.overrides:
+            render_args = cmd.index("--render-output")
+            cmd[render_args:render_args] = ["-P", str(self.workspace_root / "scripts" / "overrides.py")]
+            cmd.extend(["--", job.overrides])
         
-        process = subprocess.run(cmd, check=True, text=True)
+        process = self._run_watched(cmd, render_dir, cancel)
         
         if job.mode == RenderMode.still:
             # Get list of rendered PNG files
@@ -79,13 +205,32 @@ class BlenderService:
                 rendered_files = []
 
             # Compress rendered files to JPG format
-            compressed_pairs = self.ffmpeg_service.compress_images(rendered_files, job_dir)
+            compressed_pairs = self.ffmpeg_service.compress_images(rendered_files, job_dir, on_output)
+
+            # Tile compressed frames into contact sheets for quick scrubbing
+            if cancel is not None and cancel.is_set():
+                raise RenderCancelledError("Render cancelled before creating contact sheets")
+            if compressed_pairs:
+                self.ffmpeg_service.create_contact_sheets(job_dir)
             
             return compressed_pairs, process.stdout, process.stderr
         else:
             # For animation mode, convert the rendered video to mp4
             rendered_video = next(render_dir.glob("*"), None)
+            if cancel is not None and cancel.is_set():
+                raise RenderCancelledError("Render cancelled before encoding")
             if rendered_video:
                 video_pair = self.ffmpeg_service.convert_to_mp4(rendered_video, job_dir)
+
+                # Review copies: a low-bitrate proxy and segmented HLS renditions
+                preview_file = None
+                try:
+                    preview_file = self.ffmpeg_service.create_preview(rendered_video, job_dir)
+                    self.ffmpeg_service.create_stream(rendered_video, job_dir)
+                except Exception as e:
+                    logger.warning(f"Error creating review copies of {rendered_video.name}: {e}")
+
+                if on_output:
+                    on_output(*video_pair, preview_file)
                 return [video_pair], process.stdout, process.stderr
             return [], process.stdout, process.stderr
@@ -0,0 +1,361 @@
+from datetime import timedelta
+from pathlib import Path, PurePosixPath
+from typing import BinaryIO, Dict, List, Optional, Tuple
+import gzip
+import hashlib
+import json
+import lzma
+import os
+import re
+import stat
+import tarfile
+import tempfile
+import time
+import zipfile
+import zlib
+
+from blender_on_aws.models.db import Job
+from blender_on_aws.services.workspace_service import WorkspaceService
+
+ASSET_ID = re.compile(r'^[0-9a-f]{64}$')
+# Raised while reading truncated or corrupt archives
+ARCHIVE_ERRORS = (zipfile.BadZipFile, tarfile.TarError, EOFError, zlib.error, gzip.BadGzipFile, lzma.LZMAError)
+
+
+class BundleService:
+    """
+    Service class to store project bundles (a .blend with its textures, HDRIs and linked libraries).
+
+    Every file of a bundle is stored once in a shared asset cache keyed by its content hash
+    (assets/<sha256[:2]>/<sha256>). A bundle is a manifest mapping relative paths to asset hashes
+    (bundles/<sha256 of the manifest>.json), and job directories are materialized from it with
+    hard links, so a new upload only adds the assets that changed.
+    """
+
+    def __init__(self, workspace_service: WorkspaceService, max_bundle_bytes: Optional[int] = None):
+        """
+        Initialize bundle service.
+
+        Args:
+            workspace_service (WorkspaceService): Workspace service owning the asset cache and job directories
+            max_bundle_bytes (Optional[int]): Limit on the extracted size of an archive, None for no limit
+        """
+        self.workspace_service = workspace_service
+        self.max_bundle_bytes = max_bundle_bytes
+        self.assets_dir = workspace_service.workspace_root / 'assets'
+        self.bundles_dir = workspace_service.workspace_root / 'bundles'
+
+    def get_asset_path(self, asset_id: str) -> Path:
+        return self.assets_dir / asset_id[:2] / asset_id
+
+    @staticmethod
+    def normalize_path(name: str) -> str:
+        """
+        Normalize a path inside a bundle, rejecting anything that could escape the job directory.
+
+        Raises:
+            ValueError: If the path is absolute, empty or contains '..'
+        """
+        path = PurePosixPath(name.replace('\\', '/'))
+        parts = [part for part in path.parts if part not in ('', '.')]
+        if path.is_absolute() or not parts or '..' in parts or ':' in parts[0]:
+            raise ValueError(f"Unsafe path in bundle: {name}")
+        return '/'.join(parts)
+
+    def store_asset(self, stream: BinaryIO, expected_id: Optional[str] = None) -> Tuple[str, bool]:
+        """
+        Store a file in the asset cache unless an identical file is already there.
+
+        Args:
+            stream (BinaryIO): Readable stream with the file content
+            expected_id (Optional[str]): Hash the content must have
+
+        Returns:
+            Tuple[str, bool]: (asset id, True if the asset was new)
+
+        Raises:
+            ValueError: If the content does not match expected_id or the bundle size limit is exceeded
+        """
+        self.assets_dir.mkdir(parents=True, exist_ok=True)
+
+        digest = hashlib.sha256()
+        tmp_file = tempfile.NamedTemporaryFile(dir=self.assets_dir, delete=False)
+        try:
+            # Inside the try, so a failing read (e.g. a corrupt archive member) removes the partial file
+            with tmp_file:
+                while chunk := stream.read(1024 * 1024):
+                    digest.update(chunk)
+                    tmp_file.write(chunk)
+                    if self.max_bundle_bytes is not None and tmp_file.tell() > self.max_bundle_bytes:
+                        break
+
+            asset_id = digest.hexdigest()
+            if self.max_bundle_bytes is not None and os.path.getsize(tmp_file.name) > self.max_bundle_bytes:
+                raise ValueError(f"Asset exceeds {self.max_bundle_bytes} bytes")
+            if expected_id is not None and asset_id != expected_id:
+                raise ValueError(f"Asset content does not match {expected_id}")
+
+            asset_path = self.get_asset_path(asset_id)
+            if asset_path.exists():
+                # Refresh the change time so collect_unused keeps the asset until jobs link to it
+                os.utime(asset_path)
+                return asset_id, False
+            asset_path.parent.mkdir(exist_ok=True)
+            # Assets are shared by hard links across jobs and must never be modified in place
+            os.chmod(tmp_file.name, 0o444)
+            os.replace(tmp_file.name, asset_path)
+            return asset_id, True
+        finally:
+            if os.path.exists(tmp_file.name):
+                os.unlink(tmp_file.name)
+
+    def get_missing_assets(self, asset_ids: List[str]) -> List[str]:
+        """Return the asset ids that are not in the cache, so clients upload only those."""
+        return sorted({asset_id for asset_id in asset_ids if not self.get_asset_path(asset_id).is_file()})
+
+    def touch_assets(self, asset_ids: List[str]) -> List[str]:
+        """
+        Refresh the change time of cached assets, so collect_unused keeps them until jobs link to them.
+
+        Returns:
+            List[str]: Asset ids that are not in the cache
+        """
+        missing = set()
+        for asset_id in set(asset_ids):
+            try:
+                os.utime(self.get_asset_path(asset_id))
+            except FileNotFoundError:
+                missing.add(asset_id)
+        return sorted(missing)
+
+    def store_manifest(self, files: Dict[str, str]) -> str:
+        """
+        Store a bundle manifest whose assets are all in the cache.
+
+        Args:
+            files (Dict[str, str]): Relative path -> asset id
+
+        Returns:
+            str: Bundle id
+
+        Raises:
+            ValueError: If a path is unsafe, conflicts with a directory or an asset id is malformed
+            FileNotFoundError: If assets are missing from the cache
+        """
+        files = {self.normalize_path(path): asset_id for path, asset_id in files.items()}
+        if not files:
+            raise ValueError("Bundle contains no files")
+        if any(not ASSET_ID.match(asset_id) for asset_id in files.values()):
+            raise ValueError("Malformed asset id in bundle")
+
+        directories = {str(parent) for path in files for parent in PurePosixPath(path).parents}
+        conflicts = directories & set(files)
+        if conflicts:
+            raise ValueError(f"Paths used both as file and directory: {', '.join(sorted(conflicts))}")
+
+        missing = self.touch_assets(list(files.values()))
+        if missing:
+            raise FileNotFoundError(f"{len(missing)} assets are missing from the cache")
+
+        manifest = json.dumps(files, sort_keys=True, indent=0).encode()
+        bundle_id = hashlib.sha256(manifest).hexdigest()
+
+        self.bundles_dir.mkdir(parents=True, exist_ok=True)
+        bundle_file = self.bundles_dir / f'{bundle_id}.json'
+        if not bundle_file.exists():
+            tmp_file = bundle_file.with_name(f'{bundle_id}.json.{os.getpid()}.tmp')
+            tmp_file.write_bytes(manifest)
+            os.replace(tmp_file, bundle_file)
+        return bundle_id
+
+    def store_archive(self, archive: BinaryIO) -> Tuple[str, Dict[str, str], int]:
+        """
+        Store the files of a zip or tar archive (optionally compressed) as a bundle.
+        Only regular files are stored, links and special files are skipped.
+
+        Args:
+            archive (BinaryIO): Seekable archive file
+
+        Returns:
+            Tuple[str, Dict[str, str], int]: (bundle id, relative path -> asset id, number of new assets)
+
+        Raises:
+            ValueError: If the archive is not a zip or tar file, is corrupt, or contains unsafe paths
+        """
+        files = {}
+        new_assets = 0
+        total_bytes = 0
+
+        def add(name: str, size: int, open_member):
+            nonlocal new_assets, total_bytes
+            path = self.normalize_path(name)
+            total_bytes += size
+            if self.max_bundle_bytes is not None and total_bytes > self.max_bundle_bytes:
+                raise ValueError(f"Bundle exceeds {self.max_bundle_bytes} bytes")
+            with open_member() as member_stream:
+                files[path], created = self.store_asset(member_stream)
+            new_assets += created
+
+        if zipfile.is_zipfile(archive):
+            archive.seek(0)
+            try:
+                with zipfile.ZipFile(archive) as zip_file:
+                    for info in zip_file.infolist():
+                        if info.is_dir() or stat.S_ISLNK(info.external_attr >> 16):
+                            continue
+                        add(info.filename, info.file_size, lambda: zip_file.open(info))
+            except ARCHIVE_ERRORS as e:
+                raise ValueError(f"Corrupt zip archive: {e}") from e
+        else:
+            archive.seek(0)
+            try:
+                tar_file = tarfile.open(fileobj=archive, mode='r:*')
+            except tarfile.TarError as e:
+                raise ValueError("Not a zip or tar archive") from e
+            try:
+                with tar_file:
+                    for member in tar_file:
+                        if not member.isfile():
+                            continue
+                        add(member.name, member.size, lambda: tar_file.extractfile(member))
+            except ARCHIVE_ERRORS as e:
+                raise ValueError(f"Corrupt tar archive: {e}") from e
+
+        return self.store_manifest(files), files, new_assets
+
+    def store_directory(self, directory: Path) -> Tuple[str, Dict[str, str], int]:
+        """
+        Store the files of a local project directory as a bundle.
+
+        Args:
+            directory (Path): Project directory
+
+        Returns:
+            Tuple[str, Dict[str, str], int]: (bundle id, relative path -> asset id, number of new assets)
+        """
+        files = {}
+        new_assets = 0
+        for file in sorted(directory.rglob('*')):
+            if file.is_symlink() or not file.is_file():
+                continue
+            with open(file, 'rb') as f:
+                files[file.relative_to(directory).as_posix()], created = self.store_asset(f)
+            new_assets += created
+        return self.store_manifest(files), files, new_assets
+
+    def resolve_bundle(self, bundle_id: str) -> Dict[str, str]:
+        """
+        Load a stored bundle manifest.
+
+        Args:
+            bundle_id (str): Bundle id
+
+        Returns:
+            Dict[str, str]: Relative path -> asset id
+
+        Raises:
+            FileNotFoundError: If the bundle or one of its assets is not stored
+        """
+        bundle_file = self.bundles_dir / f'{bundle_id}.json'
+        if not ASSET_ID.match(bundle_id) or not bundle_file.is_file():
+            raise FileNotFoundError(f"Bundle {bundle_id} not found")
+
+        files = json.loads(bundle_file.read_text())
+        if self.touch_assets(list(files.values())):
+            raise FileNotFoundError(f"Assets of bundle {bundle_id} are missing, upload it again")
+        return files
+
+    @staticmethod
+    def find_main_file(files: Dict[str, str], main: Optional[str] = None) -> str:
+        """
+        Pick the .blend file a bundle's jobs render.
+
+        Args:
+            files (Dict[str, str]): Relative path -> asset id
+            main (Optional[str]): Requested path, defaults to the only .blend closest to the bundle root
+
+        Returns:
+            str: Relative path of the main .blend file
+
+        Raises:
+            ValueError: If the requested file is not a .blend in the bundle or the choice is ambiguous
+        """
+        if main is not None:
+            main = BundleService.normalize_path(main)
+            if main not in files or not main.endswith('.blend'):
+                raise ValueError(f"{main} is not a .blend file in the bundle")
+            return main
+
+        blend_files = [path for path in files if path.endswith('.blend')]
+        if not blend_files:
+            raise ValueError("Bundle contains no .blend file")
+        depth = min(path.count('/') for path in blend_files)
+        candidates = [path for path in blend_files if path.count('/') == depth]
+        if len(candidates) > 1:
+            raise ValueError(f"Several .blend files could be the main file: {', '.join(sorted(candidates))}")
+        return candidates[0]
+
+    def link_job_bundle(self, job: Job, files: Dict[str, str]) -> Path:
+        """
+        Create a job directory whose src/ mirrors a bundle, linking every file to the asset cache.
+
+        Args:
+            job (Job): Created job instance
+            files (Dict[str, str]): Relative path -> asset id
+
+        Returns:
+            Path: Path to the created job directory
+
+        Raises:
+            FileNotFoundError: If an asset was removed from the cache
+        """
+        src_dir = self.workspace_service.parse_job_directory(job) / 'src'
+        for path, asset_id in files.items():
+            file_path = src_dir / path
+            file_path.parent.mkdir(parents=True, exist_ok=True)
+            self.workspace_service.link_file(self.get_asset_path(asset_id), file_path)
+        return src_dir.parent
+
+    def collect_unused(self, older_than: timedelta) -> int:
+        """
+        Remove cached assets and stored sources no job links to anymore.
+        An entry is unused when its only hard link is the cache itself and its link count
+        has not changed for older_than. Nothing is removed where hard links are not
+        supported, since jobs would then reference the cache through symlinks.
+
+        Args:
+            older_than (timedelta): Time since the last link change after which an entry is removed
+
+        Returns:
+            int: Number of removed files
+        """
+        root = self.workspace_service.workspace_root
+        if not self._supports_hard_links(root):
+            return 0
+
+        cutoff = time.time() - older_than.total_seconds()
+        removed = 0
+        for store_dir in (self.assets_dir, root / 'sources'):
+            for file in (store_dir.glob('*/*') if store_dir.exists() else []):
+                try:
+                    file_stat = file.lstat()
+                    # ctime changes whenever a link is added or removed
+                    if stat.S_ISREG(file_stat.st_mode) and file_stat.st_nlink == 1 and file_stat.st_ctime < cutoff:
+                        file.unlink()
+                        removed += 1
+                        if not any(file.parent.iterdir()):
+                            file.parent.rmdir()
+                except OSError as e:
+                    print(f"Error collecting {file}: {e}")
+        return removed
+
+    @staticmethod
+    def _supports_hard_links(directory: Path) -> bool:
+        with tempfile.TemporaryDirectory(dir=directory) as tmp_dir:
+            probe = Path(tmp_dir) / 'probe'
+            probe.touch()
+            try:
+                os.link(probe, Path(tmp_dir) / 'link')
+                return True
+            except OSError:
+                return False
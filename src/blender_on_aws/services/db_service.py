@@ -1,10 +1,11 @@
 import os
-from sqlalchemy import create_engine
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import Connection, create_engine, func, inspect, text
 from sqlalchemy.sql.expression import null
 from sqlalchemy.orm import sessionmaker
 from typing import Optional, List
 
-from blender_on_aws.models.db import Base, Job
+from blender_on_aws.models.db import JOB_REVISION_TRIGGERS, Base, Job, JobOutput, Worker
 
 
 class DatabaseService:
@@ -26,9 +27,38 @@ class DatabaseService:
             os.makedirs(db_dir)
             
         self.engine = create_engine(f'sqlite:///{self.db_path}')
-        Base.metadata.create_all(self.engine)
+        # The dashboard, API, janitor and workers start together after an upgrade. The write lock makes
+        # each of them inspect the schema only after the previous one finished changing it
+        with self.engine.connect() as connection:
+            connection.exec_driver_sql('BEGIN IMMEDIATE')
+            Base.metadata.create_all(connection)
+            self._migrate_columns(connection)
+            self._create_revision_triggers(connection)
+            connection.commit()
         self.Session = sessionmaker(bind=self.engine)
 
+    def _migrate_columns(self, connection: Connection):
+        """Add columns and indexes that were introduced after a table was created in an existing database."""
+        inspector = inspect(connection)
+        for table in Base.metadata.sorted_tables:
+            existing = {column['name'] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing:
+                    continue
+                column_type = column.type.compile(dialect=self.engine.dialect)
+                connection.execute(text(f'ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}'))
+            for index in table.indexes:
+                index.create(connection, checkfirst=True)
+
+    def _create_revision_triggers(self, connection: Connection):
+        """Create the job revision counter, continuing from the revisions already handed out, and its triggers."""
+        connection.execute(text(
+            'INSERT OR IGNORE INTO job_revisions (id, revision) '
+            'SELECT 1, COALESCE(MAX(revision), 0) FROM jobs'
+        ))
+        for trigger in JOB_REVISION_TRIGGERS:
+            connection.execute(text(trigger))
+
     def create_job(self, job_name: str, frame_range: str, mode: str, source_file: str) -> Job:
         """Create a new job in the database.
         
@@ -54,6 +84,24 @@ class DatabaseService:
             session.refresh(job)
             return job
  
+    def create_jobs(self, jobs: List[dict], status: str = 'queued') -> List[Job]:
+        """Create several jobs in a single transaction.
+        
+        Args:
+            jobs (List[dict]): Job attributes (name, frame_range, mode, source_file, overrides) for each job
+            status (str): Initial status, 'pending' keeps the jobs out of the queue until released
+
+        Returns:
+            List[Job]: Created job instances, in the given order
+        """
+        with self.Session() as session:
+            created = [Job(status=status, **job) for job in jobs]
+            session.add_all(created)
+            session.commit()
+            for job in created:
+                session.refresh(job)
+            return created
+
     def get_job(self, job_id: str) -> Optional[Job]:
         """Retrieve a job by its ID.
         
@@ -67,13 +115,13 @@ class DatabaseService:
             return session.query(Job).filter(Job.id == job_id).first()
 
     def get_all_jobs(self) -> List[Job]:
-        """Retrieve all jobs from the database, sorted by creation time (newest first).
+        """Retrieve all jobs not marked for deletion, sorted by creation time (newest first).
         
         Returns:
             List[Job]: List of all jobs ordered by created_at in descending order
         """
         with self.Session() as session:
-            return session.query(Job).order_by(Job.created_at.desc()).all()
+            return session.query(Job).filter(Job.deleted_at.is_(None)).order_by(Job.created_at.desc()).all()
     
     def get_queued_jobs(self) -> List[Job]:
         """Retrieve all queued (unfinished) jobs from the database, sorted by creation time (newest first).
@@ -82,7 +130,196 @@ class DatabaseService:
             List[Job]: List of jobs where finished_at is None, ordered by created_at in descending order
         """
         with self.Session() as session:
-            return session.query(Job).filter(Job.status != 'complete').order_by(Job.created_at.asc()).all()
+            return session.query(Job).filter(
+                Job.status == 'queued',
+                Job.deleted_at.is_(None),
+            ).order_by(Job.created_at.asc()).all()
+
+    def get_jobs_by_status(self, statuses: List[str]) -> List[Job]:
+        """Retrieve jobs not marked for deletion in any of the given statuses.
+
+        Args:
+            statuses (List[str]): Statuses to include, e.g. ['queued', 'active']
+
+        Returns:
+            List[Job]: List of jobs ordered by created_at in ascending order
+        """
+        with self.Session() as session:
+            return session.query(Job).filter(
+                Job.status.in_(statuses),
+                Job.deleted_at.is_(None),
+            ).order_by(Job.created_at.asc()).all()
+
+    def get_recently_completed_jobs(self, limit: int) -> List[Job]:
+        """Retrieve the most recently completed jobs with a known start time.
+
+        Args:
+            limit (int): Maximum number of jobs
+
+        Returns:
+            List[Job]: List of jobs ordered by finished_at in descending order
+        """
+        with self.Session() as session:
+            return session.query(Job).filter(
+                Job.status == 'complete',
+                Job.started_at.isnot(None),
+                Job.finished_at.isnot(None),
+            ).order_by(Job.finished_at.desc()).limit(limit).all()
+
+    def claim_job(self, job_id: int, worker_id: str) -> Optional[Job]:
+        """Atomically move a queued job to active for a worker.
+        
+        Args:
+            job_id (int): ID of the job to claim
+            worker_id (str): ID of the claiming worker
+            
+        Returns:
+            Optional[Job]: Claimed job, None if another worker claimed it first or it was deleted
+        """
+        with self.Session() as session:
+            # A single conditional UPDATE, so two workers can never claim the same job
+            claimed = session.query(Job).filter(
+                Job.id == job_id,
+                Job.status == 'queued',
+                Job.deleted_at.is_(None),
+            ).update(
+                {
+                    Job.status: 'active',
+                    Job.worker_id: worker_id,
+                    Job.started_at: datetime.now(timezone.utc),
+                    Job.attempts: func.coalesce(Job.attempts, 0) + 1,
+                },
+                synchronize_session=False,
+            )
+            session.commit()
+            if not claimed:
+                return None
+            return session.query(Job).filter(Job.id == job_id).first()
+
+    def requeue_orphaned_jobs(self, dead_after: timedelta, max_attempts: int) -> List[int]:
+        """Put active jobs back in the queue when their worker stopped sending heartbeats.
+        Jobs that already used max_attempts are marked failed instead, a scene that crashes
+        or hangs its worker would otherwise be retried forever.
+        
+        Args:
+            dead_after (timedelta): Heartbeat age after which a worker is considered dead
+            max_attempts (int): Attempts after which an orphaned job fails
+            
+        Returns:
+            List[int]: IDs of the requeued or failed jobs
+        """
+        now = datetime.now(timezone.utc)
+        cutoff = now - dead_after
+        with self.Session() as session:
+            live_workers = session.query(Worker.id).filter(Worker.last_heartbeat >= cutoff)
+            jobs = session.query(Job).filter(
+                Job.status == 'active',
+                (Job.worker_id.is_(None)) | (Job.worker_id.notin_(live_workers)),
+            ).all()
+            for job in jobs:
+                if (job.attempts or 0) >= max_attempts:
+                    job.status = 'failed'
+                    job.finished_at = now
+                    job.last_error = f"Worker {job.worker_id} stopped responding during attempt {job.attempts}"
+                else:
+                    job.status = 'queued'
+                job.worker_id = None
+            session.commit()
+            return [job.id for job in jobs]
+
+    def record_heartbeat(self, worker_id: str, hostname: str, current_job_id: Optional[int] = None):
+        """Record that a worker is alive and what it is working on.
+        
+        Args:
+            worker_id (str): ID of the worker
+            hostname (str): Host the worker runs on
+            current_job_id (Optional[int]): ID of the job being rendered, None if idle
+        """
+        with self.Session() as session:
+            now = datetime.now(timezone.utc)
+            worker = session.get(Worker, worker_id)
+            if worker is None:
+                worker = Worker(id=worker_id, hostname=hostname)
+                session.add(worker)
+            worker.last_heartbeat = now
+            if current_job_id is not None:
+                worker.idle_since = None
+            elif worker.current_job_id is not None or worker.idle_since is None:
+                worker.idle_since = now
+            worker.current_job_id = current_job_id
+            session.commit()
+
+    def get_workers(self) -> List[Worker]:
+        """Retrieve all workers, most recent heartbeat first.
+        
+        Returns:
+            List[Worker]: List of workers
+        """
+        with self.Session() as session:
+            return session.query(Worker).order_by(Worker.last_heartbeat.desc()).all()
+
+    def prune_workers(self, older_than: timedelta) -> int:
+        """Forget workers whose last heartbeat is older than the given age.
+        
+        Args:
+            older_than (timedelta): Heartbeat age after which a worker is removed
+            
+        Returns:
+            int: Number of workers removed
+        """
+        cutoff = datetime.now(timezone.utc) - older_than
+        with self.Session() as session:
+            count = session.query(Worker).filter(Worker.last_heartbeat < cutoff).delete()
+            session.commit()
+            return count
+
+    def get_jobs_changed_since(self, revision: Optional[int] = None) -> List[Job]:
+        """Retrieve jobs created, updated or marked for deletion after a revision, including deleted ones.
+        
+        Args:
+            revision (Optional[int]): Last revision seen by the caller, all jobs if None
+            
+        Returns:
+            List[Job]: Changed jobs ordered by revision in ascending order
+        """
+        with self.Session() as session:
+            query = session.query(Job)
+            if revision is not None:
+                query = query.filter(Job.revision > revision)
+            return query.order_by(Job.revision.asc()).all()
+
+    def count_jobs(self) -> int:
+        """Count jobs not marked for deletion.
+        
+        Returns:
+            int: Number of jobs
+        """
+        with self.Session() as session:
+            return session.query(Job).filter(Job.deleted_at.is_(None)).count()
+
+    def get_deleted_jobs(self) -> List[Job]:
+        """Retrieve all jobs marked for deletion whose workspace has not been reclaimed yet.
+        Active jobs are left out until their worker releases them.
+
+        Returns:
+            List[Job]: List of jobs ordered by deleted_at in ascending order
+        """
+        with self.Session() as session:
+            return session.query(Job).filter(
+                Job.deleted_at.isnot(None),
+                Job.status != 'active',
+            ).order_by(Job.deleted_at.asc()).all()
+
+    def mark_job_deleted(self, job_id: str) -> bool:
+        """Mark a job for deletion. Its workspace and row are reclaimed later by the janitor.
+        
+        Args:
+            job_id (str): ID of the job to delete
+            
+        Returns:
+            bool: True if job was marked, False if not found
+        """
+        return self.update_job(job_id, deleted_at=datetime.now(timezone.utc)) is not None
 
     def update_job(self, job_id: str, **kwargs) -> Optional[Job]:
         """Update a job's attributes.
@@ -102,6 +339,24 @@ class DatabaseService:
                 session.commit()
             return job
 
+    def update_jobs(self, job_ids: List[int], **kwargs) -> int:
+        """Update the same attributes of several jobs in a single transaction.
+        
+        Args:
+            job_ids (List[int]): IDs of the jobs to update
+            **kwargs: Attributes to update
+            
+        Returns:
+            int: Number of jobs updated
+        """
+        with self.Session() as session:
+            jobs = session.query(Job).filter(Job.id.in_(job_ids)).all()
+            for job in jobs:
+                for key, value in kwargs.items():
+                    setattr(job, key, value)
+            session.commit()
+            return len(jobs)
+
     def delete_job(self, job_id: str) -> bool:
         """Delete a job from the database.
         
@@ -114,7 +369,76 @@ class DatabaseService:
         with self.Session() as session:
             job = session.query(Job).filter(Job.id == job_id).first()
             if job:
+                session.query(JobOutput).filter(JobOutput.job_id == job_id).delete()
                 session.delete(job)
                 session.commit()
                 return True
             return False
+
+    def add_job_output(self, job_id: int, render_file: str, **kwargs) -> JobOutput:
+        """Add an output entry to a job's manifest, replacing any entry for the same render file.
+        
+        Args:
+            job_id (int): ID of the job the output belongs to
+            render_file (str): Render file path relative to the job directory
+            **kwargs: Remaining output attributes (static_file, preview_file, size, width, height, checksum)
+            
+        Returns:
+            JobOutput: Stored manifest entry
+        """
+        with self.Session() as session:
+            output = session.query(JobOutput).filter(
+                JobOutput.job_id == job_id,
+                JobOutput.render_file == render_file,
+            ).first()
+            if output is None:
+                output = JobOutput(job_id=job_id, render_file=render_file)
+                session.add(output)
+            for key, value in kwargs.items():
+                setattr(output, key, value)
+            session.commit()
+            session.refresh(output)
+            return output
+
+    def get_job_outputs(self, job_id: int, offset: int = 0, limit: Optional[int] = None) -> List[JobOutput]:
+        """Retrieve the output manifest of a job, ordered by render file.
+        
+        Args:
+            job_id (int): ID of the job
+            offset (int): Number of entries to skip
+            limit (Optional[int]): Maximum number of entries to return, all if None
+            
+        Returns:
+            List[JobOutput]: Manifest entries of the job
+        """
+        with self.Session() as session:
+            query = session.query(JobOutput).filter(JobOutput.job_id == job_id).order_by(JobOutput.render_file.asc())
+            return query.offset(offset).limit(limit).all()
+
+    def count_job_outputs(self, job_id: int) -> int:
+        """Count the entries in a job's output manifest.
+        
+        Args:
+            job_id (int): ID of the job
+            
+        Returns:
+            int: Number of manifest entries
+        """
+        with self.Session() as session:
+            return session.query(JobOutput).filter(JobOutput.job_id == job_id).count()
+
+    def replace_job_outputs(self, job_id: int, outputs: List[dict]) -> int:
+        """Replace the whole output manifest of a job in a single transaction.
+        
+        Args:
+            job_id (int): ID of the job
+            outputs (List[dict]): Output attributes for each manifest entry
+            
+        Returns:
+            int: Number of entries written
+        """
+        with self.Session() as session:
+            session.query(JobOutput).filter(JobOutput.job_id == job_id).delete()
+            session.add_all([JobOutput(job_id=job_id, **output) for output in outputs])
+            session.commit()
+            return len(outputs)
@@ -0,0 +1,78 @@
+from pathlib import Path
+from typing import BinaryIO, Iterator, Optional, Tuple
+import shutil
+import zipfile
+
+from blender_on_aws.models.db import Job
+from blender_on_aws.services.manifest_service import ManifestService
+from blender_on_aws.utils.frames import FrameSet
+
+# Formats that are already compressed and gain nothing from deflate
+STORED_SUFFIXES = {'.png', '.jpg', '.jpeg', '.mp4', '.mkv', '.avi', '.mov', '.webm'}
+
+
+class ExportService:
+    """Service class to export job outputs as a ZIP stream."""
+
+    def __init__(self, manifest_service: ManifestService, chunk_size: int = 1024 * 1024):
+        """
+        Initialize export service.
+
+        Args:
+            manifest_service (ManifestService): Manifest service listing job outputs
+            chunk_size (int): Number of bytes copied into the archive at a time
+        """
+        self.manifest_service = manifest_service
+        self.chunk_size = chunk_size
+
+    def iter_export_files(self, job: Job, frames: Optional[FrameSet] = None) -> Iterator[Tuple[Path, str]]:
+        """
+        List the files of a job export with their archive names.
+
+        Args:
+            job (Job): Job to export
+            frames (Optional[FrameSet]): Frame numbers to include, all outputs if None
+
+        Yields:
+            Tuple[Path, str]: (file path, archive name) pairs
+        """
+        job_dir = self.manifest_service.workspace_service.parse_job_directory(job)
+
+        for render_file, static_file, _ in self.manifest_service.get_outputs(job):
+            # Animation outputs are named after a frame range and are never filtered
+            if frames is not None and render_file.stem.isdigit() and int(render_file.stem) not in frames:
+                continue
+            # Once the raw animation render is dropped, the MP4 is both render and static file
+            for output_file in dict.fromkeys((render_file, static_file)):
+                yield output_file, str(output_file.relative_to(job_dir))
+
+    def write_zip(self, job: Job, stream: BinaryIO, frames: Optional[FrameSet] = None) -> int:
+        """
+        Write a job's outputs as a ZIP archive to a (possibly non-seekable) stream.
+        Files are copied in chunks, so memory use does not depend on the size of the job.
+
+        Args:
+            job (Job): Job to export
+            stream (BinaryIO): Writable stream, e.g. an HTTP response body
+            frames (Optional[FrameSet]): Frame numbers to include, all outputs if None
+
+        Returns:
+            int: Number of files written to the archive
+        """
+        count = 0
+        with zipfile.ZipFile(stream, mode='w') as archive:
+            for output_file, arcname in self.iter_export_files(job, frames):
+                if not output_file.exists():
+                    print(f"Skipping missing output {output_file}")
+                    continue
+
+                info = zipfile.ZipInfo.from_file(output_file, arcname)
+                if output_file.suffix.lower() in STORED_SUFFIXES:
+                    info.compress_type = zipfile.ZIP_STORED
+                else:
+                    info.compress_type = zipfile.ZIP_DEFLATED
+
+                with open(output_file, 'rb') as src, archive.open(info, mode='w') as dst:
+                    shutil.copyfileobj(src, dst, self.chunk_size)
+                count += 1
+        return count
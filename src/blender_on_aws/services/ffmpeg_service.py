@@ -1,14 +1,58 @@
 from pathlib import Path
-from typing import List, Tuple
+from typing import Callable, List, Optional, Tuple
+import logging
+import shutil
 import subprocess
 
+from blender_on_aws.models.job import CONTACT_SHEET_LEVELS
+
+logger = logging.getLogger("blender_on_aws.render.ffmpeg")
+
+# Suffix of the low-bitrate proxy played by default in the UI
+PREVIEW_SUFFIX = "_proxy"
+
+# HLS renditions: maximum height (px) -> video bitrate
+STREAM_RENDITIONS = {
+    360: "800k",
+    720: "2500k",
+}
+
 class FFmpegService:
     """Service class to handle FFmpeg-related operations."""
     
-    def __init__(self):
-        """Initialize FFmpeg service."""
-        pass
+    def __init__(self, timeout: Optional[float] = None):
+        """
+        Initialize FFmpeg service.
+        
+        Args:
+            timeout (Optional[float]): Timeout in seconds for each ffmpeg call, None to wait forever
+        """
+        self.timeout = timeout
     
+    def _run(self, cmd: List[str]) -> subprocess.CompletedProcess:
+        """
+        Run an ffmpeg command, writing its output to the render log.
+        
+        Args:
+            cmd (List[str]): Command to run
+            
+        Returns:
+            subprocess.CompletedProcess: Completed process
+        """
+        logger.info("$ " + " ".join(cmd))
+        try:
+            result = subprocess.run(cmd, check=True, capture_output=True, text=True, timeout=self.timeout)
+        except subprocess.CalledProcessError as e:
+            if e.stderr:
+                logger.info(e.stderr.rstrip())
+            raise
+        except subprocess.TimeoutExpired:
+            logger.warning(f"Timed out after {self.timeout:.0f}s")
+            raise
+        if result.stderr:
+            logger.info(result.stderr.rstrip())
+        return result
+
     def convert_to_mp4(self, video_file: Path, run_dir: Path) -> Tuple[Path, Path]:
         """
         Convert rendered video to MP4 format.
@@ -37,25 +81,134 @@ class FFmpegService:
             "-preset", "medium",  # Encoding speed preset
             "-crf", "23",  # Quality (0-51, lower is better)
             "-pix_fmt", "yuv420p",  # Pixel format for better compatibility
+            "-movflags", "+faststart",  # Put the index first so playback starts before download ends
             str(mp4_path)  # Output file
         ]
         
         try:
             # Execute ffmpeg command
-            subprocess.run(cmd, check=True, capture_output=True, text=True)
+            self._run(cmd)
             return (video_file, mp4_path)
         except subprocess.CalledProcessError as e:
             raise Exception(f"Video conversion failed: {e.stderr}")
         except Exception as e:
             raise Exception(f"Error during video conversion: {str(e)}")
     
-    def compress_images(self, png_files: List[Path], run_dir: Path) -> List[Tuple[Path, Path]]:
+    def create_preview(self, video_file: Path, run_dir: Path) -> Path:
+        """
+        Create a low-bitrate 540p proxy of a rendered video for quick review.
+        
+        Args:
+            video_file (Path): Path to the input video file
+            run_dir (Path): Path to the run directory
+            
+        Returns:
+            Path: Path to the proxy MP4 file
+        """
+        static_dir = run_dir / "static"
+        static_dir.mkdir(parents=True, exist_ok=True)
+
+        preview_path = static_dir / f"{video_file.stem}{PREVIEW_SUFFIX}.mp4"
+
+        cmd = [
+            "ffmpeg",
+            "-y",  # Overwrite output files
+            "-i", str(video_file),  # Input file
+            "-vf", "scale=-2:'min(540,ih)'",  # Downscale to at most 540p
+            "-c:v", "libx264",  # Use H.264 codec
+            "-preset", "veryfast",  # Favor encoding speed for previews
+            "-crf", "28",  # Lower quality is fine for review
+            "-maxrate", "1500k",  # Cap bitrate for constrained connections
+            "-bufsize", "3000k",
+            "-pix_fmt", "yuv420p",  # Pixel format for better compatibility
+            "-c:a", "aac",  # Keep audio, if any, at a low bitrate
+            "-b:a", "96k",
+            "-movflags", "+faststart",  # Put the index first so playback starts immediately
+            str(preview_path)  # Output file
+        ]
+
+        try:
+            self._run(cmd)
+            return preview_path
+        except subprocess.CalledProcessError as e:
+            raise Exception(f"Preview creation failed: {e.stderr}")
+
+    def create_stream(self, video_file: Path, run_dir: Path) -> Path:
+        """
+        Segment a rendered video into adaptive HLS renditions.
+        Renditions are written to stream/<height>p/ with a master playlist at stream/master.m3u8.
+        
+        Args:
+            video_file (Path): Path to the input video file
+            run_dir (Path): Path to the run directory
+            
+        Returns:
+            Path: Path to the HLS master playlist
+        """
+        stream_dir = run_dir / "stream"
+        stream_dir.mkdir(parents=True, exist_ok=True)
+
+        heights = sorted(STREAM_RENDITIONS)
+        # Every variant carries the audio track, the var_stream_map may only reference it if it exists
+        has_audio = self.probe_has_audio(video_file)
+        split = "".join(f"[v{idx}]" for idx in range(len(heights)))
+        filters = [f"[0:v]split={len(heights)}{split}"] + [
+            f"[v{idx}]scale=-2:'min({height},ih)'[out{idx}]" for idx, height in enumerate(heights)
+        ]
+
+        cmd = [
+            "ffmpeg",
+            "-y",  # Overwrite output files
+            "-i", str(video_file),  # Input file
+            "-filter_complex", ";".join(filters),  # One scaled output per rendition
+        ]
+        for idx, height in enumerate(heights):
+            cmd.extend([
+                "-map", f"[out{idx}]",
+                f"-c:v:{idx}", "libx264",
+                f"-b:v:{idx}", STREAM_RENDITIONS[height],
+            ])
+            if has_audio:
+                cmd.extend([
+                    "-map", "0:a:0",
+                    f"-c:a:{idx}", "aac",
+                    f"-b:a:{idx}", "128k",
+                ])
+        cmd.extend([
+            "-preset", "veryfast",  # Favor encoding speed for previews
+            "-pix_fmt", "yuv420p",  # Pixel format for better compatibility
+            "-g", "48",  # Fixed GOP so segments align across renditions
+            "-sc_threshold", "0",
+            "-f", "hls",
+            "-hls_time", "4",  # Segment length in seconds
+            "-hls_playlist_type", "vod",
+            "-hls_segment_filename", str(stream_dir / "%v" / "%03d.ts"),
+            "-master_pl_name", "master.m3u8",
+            "-var_stream_map", " ".join(
+                f"v:{idx},{f'a:{idx},' if has_audio else ''}name:{height}p" for idx, height in enumerate(heights)
+            ),
+            str(stream_dir / "%v" / "index.m3u8"),
+        ])
+
+        try:
+            self._run(cmd)
+            return stream_dir / "master.m3u8"
+        except subprocess.CalledProcessError as e:
+            raise Exception(f"Stream segmentation failed: {e.stderr}")
+
+    def compress_images(
+        self,
+        png_files: List[Path],
+        run_dir: Path,
+        on_output: Optional[Callable[[Path, Path], None]] = None,
+    ) -> List[Tuple[Path, Path]]:
         """
         Compress PNG images to JPG format with 512px width.
         
         Args:
             png_files (List[Path]): List of paths to PNG files
             run_dir (Path): Path to the run directory
+            on_output (Optional[Callable[[Path, Path], None]]): Called with each (png, jpg) pair as soon as it is written
             
         Returns:
             List[Tuple[Path, Path]]: List of tuples containing (compressed_jpg_path, original_png_path)
@@ -83,13 +236,113 @@ class FFmpegService:
             
             try:
                 # Execute ffmpeg command
-                subprocess.run(cmd, check=True, capture_output=True, text=True)
-                compressed_pairs.append((png_file, jpg_path))
+                self._run(cmd)
             except subprocess.CalledProcessError as e:
-                print(f"Error compressing {png_file.name}: {e.stderr}")
+                logger.warning(f"Error compressing {png_file.name}: {e}")
                 continue
             except Exception as e:
-                print(f"Unexpected error compressing {png_file.name}: {str(e)}")
+                logger.warning(f"Unexpected error compressing {png_file.name}: {str(e)}")
                 continue
+
+            compressed_pairs.append((png_file, jpg_path))
+            # Outside the try, the callback raises to stop post-processing (e.g. once the job was deleted)
+            if on_output:
+                on_output(png_file, jpg_path)
         
         return compressed_pairs
+
+    def create_contact_sheets(self, run_dir: Path) -> List[Path]:
+        """
+        Tile the compressed JPGs of a run into contact sheets at every zoom level.
+        Sheets are written to sheets/<tile_width>/001.jpg, 002.jpg, ... in frame order.
+        
+        Args:
+            run_dir (Path): Path to the run directory
+            
+        Returns:
+            List[Path]: Paths of the generated contact sheets
+        """
+        static_dir = run_dir / "static"
+        sheets = []
+
+        for tile_width, tiles in CONTACT_SHEET_LEVELS.items():
+            sheet_dir = run_dir / "sheets" / str(tile_width)
+            sheet_dir.mkdir(parents=True, exist_ok=True)
+
+            cmd = [
+                "ffmpeg",
+                "-y",  # Overwrite output files
+                "-pattern_type", "glob",
+                "-i", str(static_dir / "*.jpg"),  # All compressed frames, in frame order
+                "-vf", f"scale={tile_width}:-2,tile={tiles}x{tiles}",  # Shrink and tile frames
+                "-q:v", "3",  # Good quality (1-31, lower is better)
+                str(sheet_dir / "%03d.jpg")  # One image per sheet
+            ]
+
+            try:
+                self._run(cmd)
+                sheets.extend(sorted(sheet_dir.glob("*.jpg")))
+            except (subprocess.CalledProcessError, subprocess.TimeoutExpired) as e:
+                logger.warning(f"Error creating {tile_width}px contact sheets: {e}")
+                continue
+
+        return sheets
+
+    def probe_has_audio(self, media_file: Path) -> bool:
+        """
+        Check with ffprobe whether a video has an audio stream.
+        
+        Args:
+            media_file (Path): Path to the media file
+            
+        Returns:
+            bool: True if it has an audio stream, False if not or if ffprobe is unavailable or fails
+        """
+        if shutil.which("ffprobe") is None:
+            return False
+
+        cmd = [
+            "ffprobe",
+            "-v", "error",
+            "-select_streams", "a",  # Audio streams only
+            "-show_entries", "stream=index",
+            "-of", "csv=p=0",
+            str(media_file),
+        ]
+
+        try:
+            result = subprocess.run(cmd, check=True, capture_output=True, text=True, timeout=self.timeout)
+            return bool(result.stdout.strip())
+        except (subprocess.CalledProcessError, subprocess.TimeoutExpired) as e:
+            logger.warning(f"Error probing {media_file.name}: {e}")
+            return False
+
+    def probe_dimensions(self, media_file: Path) -> Optional[Tuple[int, int]]:
+        """
+        Read the pixel dimensions of an image or video with ffprobe.
+        
+        Args:
+            media_file (Path): Path to the media file
+            
+        Returns:
+            Optional[Tuple[int, int]]: (width, height), or None if ffprobe is unavailable or fails
+        """
+        if shutil.which("ffprobe") is None:
+            return None
+
+        cmd = [
+            "ffprobe",
+            "-v", "error",
+            "-select_streams", "v:0",  # First video stream
+            "-show_entries", "stream=width,height",
+            "-of", "csv=p=0:s=x",  # Print as WIDTHxHEIGHT
+            str(media_file),
+        ]
+
+        try:
+            result = subprocess.run(cmd, check=True, capture_output=True, text=True, timeout=self.timeout)
+            width, height = result.stdout.strip().split("x")[:2]
+            return int(width), int(height)
+        except (subprocess.CalledProcessError, subprocess.TimeoutExpired, ValueError) as e:
+            logger.warning(f"Error probing {media_file.name}: {e}")
+            return None
@@ -0,0 +1,98 @@
+from contextlib import contextmanager
+from logging.handlers import RotatingFileHandler
+from pathlib import Path
+from typing import Iterator, Optional, Tuple
+import logging
+import os
+
+from blender_on_aws.models.db import Job
+from blender_on_aws.services.workspace_service import WorkspaceService
+
+# Parent logger of everything a job's render and post-processing writes
+RENDER_LOGGER = 'blender_on_aws.render'
+
+
+class LogService:
+    """Service class to write per-job render logs into the workspace and tail them incrementally."""
+
+    def __init__(self, workspace_service: WorkspaceService, max_bytes: int = 10 * 1024 * 1024, backup_count: int = 3):
+        """
+        Initialize log service.
+
+        Args:
+            workspace_service (WorkspaceService): Workspace service used to resolve job directories
+            max_bytes (int): Size at which a job log is rotated
+            backup_count (int): Number of rotated log files kept per job
+        """
+        self.workspace_service = workspace_service
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+
+    def get_log_file(self, job: Job) -> Path:
+        """
+        Resolve the path of a job's current log file.
+
+        Args:
+            job (Job): Job instance
+
+        Returns:
+            Path: Path to the log file
+        """
+        return self.workspace_service.parse_job_directory(job) / 'logs' / 'render.log'
+
+    @contextmanager
+    def capture(self, job: Job) -> Iterator[logging.Logger]:
+        """
+        Write everything logged under the render logger into the job's log while the context is active.
+
+        Args:
+            job (Job): Job being rendered
+
+        Yields:
+            logging.Logger: The render logger
+        """
+        log_file = self.get_log_file(job)
+        log_file.parent.mkdir(parents=True, exist_ok=True)
+
+        handler = RotatingFileHandler(log_file, maxBytes=self.max_bytes, backupCount=self.backup_count)
+        handler.setFormatter(logging.Formatter('%(message)s'))
+
+        logger = logging.getLogger(RENDER_LOGGER)
+        logger.setLevel(logging.INFO)
+        logger.addHandler(handler)
+        try:
+            yield logger
+        finally:
+            logger.removeHandler(handler)
+            handler.close()
+
+    def tail(
+        self,
+        job: Job,
+        offset: Optional[int] = None,
+        inode: Optional[int] = None,
+        max_bytes: int = 64 * 1024,
+    ) -> Tuple[str, int, Optional[int]]:
+        """
+        Read the bytes appended to a job's log since the given offset.
+
+        Args:
+            job (Job): Job instance
+            offset (Optional[int]): Offset returned by the previous call, None to start near the end
+            inode (Optional[int]): Inode returned by the previous call, used to detect rotation
+            max_bytes (int): Maximum number of bytes to read
+
+        Returns:
+            Tuple[str, int, Optional[int]]: (new text, offset for the next call, inode of the log file)
+        """
+        try:
+            with open(self.get_log_file(job), 'rb') as f:
+                stat = os.fstat(f.fileno())
+                # Start over when the log was rotated or truncated since the last read
+                if offset is None or stat.st_ino != inode or stat.st_size < offset:
+                    offset = max(0, stat.st_size - max_bytes) if offset is None else 0
+                f.seek(offset)
+                data = f.read(max_bytes)
+                return data.decode('utf-8', errors='replace'), offset + len(data), stat.st_ino
+        except FileNotFoundError:
+            return '', 0, None
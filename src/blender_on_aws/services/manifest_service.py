@@ -0,0 +1,162 @@
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+import hashlib
+import struct
+
+from blender_on_aws.models.db import Job, JobOutput
+from blender_on_aws.services.db_service import DatabaseService
+from blender_on_aws.services.ffmpeg_service import FFmpegService, PREVIEW_SUFFIX
+from blender_on_aws.services.workspace_service import WorkspaceService
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+
+
+class ManifestService:
+    """Service class to maintain the per-job output manifest stored in the database."""
+
+    def __init__(self, workspace_service: WorkspaceService, db_service: DatabaseService):
+        """
+        Initialize manifest service.
+
+        Args:
+            workspace_service (WorkspaceService): Workspace service used to resolve job directories
+            db_service (DatabaseService): Database service holding the manifest
+        """
+        self.workspace_service = workspace_service
+        self.db_service = db_service
+        self.ffmpeg_service = FFmpegService()
+
+    def describe_output(
+        self,
+        job: Job,
+        render_file: Path,
+        static_file: Path,
+        preview_file: Optional[Path] = None,
+    ) -> Dict:
+        """
+        Collect manifest attributes of a rendered output.
+
+        Args:
+            job (Job): Job the output belongs to
+            render_file (Path): Original render output
+            static_file (Path): Compressed/converted file displayed in the UI
+            preview_file (Optional[Path]): Low-bitrate proxy played by default, if any
+
+        Returns:
+            Dict: Relative paths, size, dimensions and checksum of the output
+        """
+        job_dir = self.workspace_service.parse_job_directory(job)
+
+        dimensions = self._read_png_dimensions(render_file)
+        if dimensions is None:
+            dimensions = self.ffmpeg_service.probe_dimensions(render_file)
+        width, height = dimensions if dimensions else (None, None)
+
+        return {
+            "render_file": str(render_file.relative_to(job_dir)),
+            "static_file": str(static_file.relative_to(job_dir)),
+            "preview_file": str(preview_file.relative_to(job_dir)) if preview_file else None,
+            "size": render_file.stat().st_size,
+            "width": width,
+            "height": height,
+            "checksum": self._checksum(render_file),
+        }
+
+    def record_output(
+        self,
+        job: Job,
+        render_file: Path,
+        static_file: Path,
+        preview_file: Optional[Path] = None,
+    ) -> JobOutput:
+        """
+        Add a single output to the job manifest. Called by the worker as each output is produced.
+
+        Args:
+            job (Job): Job the output belongs to
+            render_file (Path): Original render output
+            static_file (Path): Compressed/converted file displayed in the UI
+            preview_file (Optional[Path]): Low-bitrate proxy played by default, if any
+
+        Returns:
+            JobOutput: Stored manifest entry
+        """
+        output = self.describe_output(job, render_file, static_file, preview_file)
+        return self.db_service.add_job_output(job.id, **output)
+
+    def get_outputs(
+        self, job: Job, offset: int = 0, limit: Optional[int] = None
+    ) -> List[Tuple[Path, Path, Optional[Path]]]:
+        """
+        Resolve the job manifest into output paths without touching the file system.
+
+        Args:
+            job (Job): Job to list outputs for
+            offset (int): Number of outputs to skip
+            limit (Optional[int]): Maximum number of outputs to return, all if None
+
+        Returns:
+            List[Tuple[Path, Path, Optional[Path]]]: Absolute (render_file, static_file, preview_file) paths
+        """
+        job_dir = self.workspace_service.parse_job_directory(job)
+        return [
+            (
+                job_dir / output.render_file,
+                job_dir / output.static_file,
+                job_dir / output.preview_file if output.preview_file else None,
+            )
+            for output in self.db_service.get_job_outputs(job.id, offset, limit)
+        ]
+
+    def count_outputs(self, job: Job) -> int:
+        """
+        Count the outputs recorded for a job.
+
+        Args:
+            job (Job): Job to count outputs for
+
+        Returns:
+            int: Number of outputs in the manifest
+        """
+        return self.db_service.count_job_outputs(job.id)
+
+    def rebuild(self, job: Job) -> int:
+        """
+        Rebuild the job manifest from the files on disk.
+
+        Args:
+            job (Job): Job to rebuild the manifest for
+
+        Returns:
+            int: Number of manifest entries written
+        """
+        job_dir = self.workspace_service.parse_job_directory(job)
+        outputs = []
+        for render_file, static_file in self.workspace_service.get_output_files(job):
+            preview_file = job_dir / 'static' / f'{render_file.stem}{PREVIEW_SUFFIX}.mp4'
+            outputs.append(
+                self.describe_output(
+                    job, render_file, static_file, preview_file if preview_file.exists() else None
+                )
+            )
+        return self.db_service.replace_job_outputs(job.id, outputs)
+
+    @staticmethod
+    def _checksum(path: Path, chunk_size: int = 1024 * 1024) -> str:
+        """Compute the SHA-256 of a file without loading it into memory."""
+        digest = hashlib.sha256()
+        with open(path, "rb") as f:
+            while chunk := f.read(chunk_size):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    @staticmethod
+    def _read_png_dimensions(path: Path) -> Optional[Tuple[int, int]]:
+        """Read width and height from the IHDR chunk of a PNG file."""
+        if path.suffix.lower() != ".png":
+            return None
+        with open(path, "rb") as f:
+            header = f.read(24)
+        if len(header) < 24 or not header.startswith(PNG_SIGNATURE):
+            return None
+        return struct.unpack(">II", header[16:24])
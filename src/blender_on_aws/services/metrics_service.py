@@ -0,0 +1,187 @@
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Dict, List, Optional
+import json
+import math
+import os
+
+from blender_on_aws.models.db import Job
+from blender_on_aws.models.job import RenderMode
+from blender_on_aws.services.db_service import DatabaseService
+from blender_on_aws.services.workspace_service import WorkspaceService
+from blender_on_aws.utils.frames import count_frames
+
+
+def _utc(value: datetime) -> datetime:
+    """SQLite drops the timezone, stored values are UTC."""
+    return value.replace(tzinfo=timezone.utc) if value.tzinfo is None else value
+
+
+class MetricsService:
+    """Service class to estimate the render backlog and worker utilization for autoscaling."""
+
+    def __init__(
+        self,
+        workspace_service: WorkspaceService,
+        db_service: DatabaseService,
+        config: Dict,
+        dead_after: timedelta,
+    ):
+        """
+        Initialize metrics service.
+
+        Args:
+            workspace_service (WorkspaceService): Workspace service, the metrics file lives in its root
+            db_service (DatabaseService): Database service holding the queue and workers
+            config (Dict): Metrics configuration (the `metrics` section of the app config)
+            dead_after (timedelta): Heartbeat age after which a worker is considered dead
+        """
+        self.workspace_service = workspace_service
+        self.db_service = db_service
+        self.dead_after = dead_after
+
+        self.default_seconds_per_frame = float(config.get('default_seconds_per_frame', 60))
+        # Estimate for animations without an end frame until one has completed, Blender's default scene length
+        self.default_open_ended_frames = int(config.get('default_open_ended_frames', 250))
+        self.history_jobs = int(config.get('history_jobs', 50))
+        self.scale_in_idle = timedelta(seconds=float(config.get('scale_in_idle_seconds', 300)))
+        self.target_backlog_seconds = float(config.get('target_backlog_seconds', 3600))
+
+    def get_metrics_file(self) -> Path:
+        return self.workspace_service.workspace_root / 'metrics.json'
+
+    def _frames(self, job: Job) -> Optional[int]:
+        """Frames a job renders, None for an animation without an end frame that has not completed."""
+        try:
+            frames = count_frames(job.mode, job.frame_range)
+        except ValueError:
+            return 1
+        return frames if frames is not None else job.rendered_frames
+
+    def get_seconds_per_frame(self) -> Dict[str, float]:
+        """
+        Measure the average render time per frame of recently completed jobs, per render mode.
+
+        Returns:
+            Dict[str, float]: Seconds per frame by mode value, the configured default where there is no history
+        """
+        totals = {mode.value: [0.0, 0] for mode in RenderMode}
+        for job in self.db_service.get_recently_completed_jobs(self.history_jobs):
+            try:
+                frames = count_frames(job.mode, job.frame_range)
+            except ValueError:
+                continue
+            if frames is None:
+                frames = job.rendered_frames
+            if not frames or job.mode not in totals:
+                continue
+            totals[job.mode][0] += (_utc(job.finished_at) - _utc(job.started_at)).total_seconds()
+            totals[job.mode][1] += frames
+
+        return {
+            mode: seconds / frames if frames else self.default_seconds_per_frame
+            for mode, (seconds, frames) in totals.items()
+        }
+
+    def get_open_ended_frames(self) -> int:
+        """
+        Estimate the length of an animation without an end frame from recently completed ones.
+
+        Returns:
+            int: Average frames rendered by such jobs, default_open_ended_frames where there is no history
+        """
+        lengths = []
+        for job in self.db_service.get_recently_completed_jobs(self.history_jobs):
+            try:
+                open_ended = count_frames(job.mode, job.frame_range) is None
+            except ValueError:
+                continue
+            if open_ended and job.rendered_frames:
+                lengths.append(job.rendered_frames)
+        return round(sum(lengths) / len(lengths)) if lengths else self.default_open_ended_frames
+
+    def collect(self, now: Optional[datetime] = None) -> Dict:
+        """
+        Estimate the backlog in worker-seconds and report each live worker's idle time.
+
+        The backlog is the queued frames times the historical seconds per frame, plus the
+        estimated remaining time of active jobs. Animations without an end frame are counted
+        with the average length of completed ones and reported as open_ended_jobs, since their
+        share of the backlog is an estimate. A worker is safe to scale in when it has been
+        idle for scale_in_idle_seconds and nothing is waiting in the queue.
+
+        Args:
+            now (Optional[datetime]): Time of the measurement, defaults to the current time
+
+        Returns:
+            Dict: Metrics, see the README for the fields
+        """
+        now = now or datetime.now(timezone.utc)
+        seconds_per_frame = self.get_seconds_per_frame()
+        open_ended_frames = self.get_open_ended_frames()
+
+        queued_jobs = queued_frames = active_jobs = open_ended_jobs = 0
+        backlog_seconds = 0.0
+        for job in self.db_service.get_jobs_by_status(['pending', 'queued', 'active']):
+            frames = self._frames(job)
+            if frames is None:
+                open_ended_jobs += 1
+                frames = open_ended_frames
+            estimate = frames * seconds_per_frame.get(job.mode, self.default_seconds_per_frame)
+            if job.status == 'active':
+                active_jobs += 1
+                if job.started_at is not None:
+                    estimate = max(0.0, estimate - (now - _utc(job.started_at)).total_seconds())
+            else:
+                queued_jobs += 1
+                queued_frames += frames
+            backlog_seconds += estimate
+
+        workers: List[Dict] = []
+        for worker in self.db_service.get_workers():
+            if now - _utc(worker.last_heartbeat) >= self.dead_after:
+                continue
+            idle_seconds = 0.0
+            if worker.current_job_id is None and worker.idle_since is not None:
+                idle_seconds = (now - _utc(worker.idle_since)).total_seconds()
+            workers.append({
+                'id': worker.id,
+                'hostname': worker.hostname,
+                'current_job_id': worker.current_job_id,
+                'idle_seconds': round(idle_seconds, 1),
+                'scale_in_safe': (
+                    worker.current_job_id is None
+                    and idle_seconds >= self.scale_in_idle.total_seconds()
+                    and queued_jobs == 0
+                ),
+            })
+
+        return {
+            'generated_at': now.isoformat(),
+            'queued_jobs': queued_jobs,
+            'queued_frames': queued_frames,
+            'active_jobs': active_jobs,
+            # Jobs whose length is estimated with open_ended_frames, the backlog is less certain with many
+            'open_ended_jobs': open_ended_jobs,
+            'open_ended_frames': open_ended_frames,
+            'seconds_per_frame': {mode: round(seconds, 2) for mode, seconds in seconds_per_frame.items()},
+            'backlog_worker_seconds': round(backlog_seconds, 1),
+            # Workers needed to drain the backlog within target_backlog_seconds
+            'desired_workers': math.ceil(backlog_seconds / self.target_backlog_seconds),
+            'live_workers': len(workers),
+            'workers': workers,
+        }
+
+    def publish(self) -> Dict:
+        """
+        Collect metrics and atomically replace the metrics file with them.
+
+        Returns:
+            Dict: Published metrics
+        """
+        metrics = self.collect()
+        metrics_file = self.get_metrics_file()
+        tmp_file = metrics_file.with_suffix('.json.tmp')
+        tmp_file.write_text(json.dumps(metrics, indent=2))
+        os.replace(tmp_file, metrics_file)
+        return metrics
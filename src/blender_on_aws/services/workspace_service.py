@@ -1,9 +1,22 @@
+from concurrent.futures import Executor
 from pathlib import Path
-from typing import Dict
-import streamlit as st
+from typing import BinaryIO, Dict, Optional
+import errno
+import gzip
+import hashlib
+import os
 import shutil
+import tempfile
 from typing import List, Tuple
 from blender_on_aws.models.db import Job
+from blender_on_aws.models.job import RenderMode
+from blender_on_aws.services.ffmpeg_service import PREVIEW_SUFFIX
+
+# Errors of os.link meaning the file system cannot hard link, where a symlink is used instead
+LINK_UNSUPPORTED_ERRNOS = {errno.EXDEV, errno.EPERM, errno.EMLINK, errno.ENOTSUP, errno.EOPNOTSUPP}
+
+GZIP_MAGIC = b'\x1f\x8b'
+ZSTD_MAGIC = b'\x28\xb5\x2f\xfd'
 
 
 class WorkspaceService:
@@ -36,12 +49,12 @@ class WorkspaceService:
             # Copy scripts folder to workspace root
             scripts_dir = Path('scripts')
             workspace_scripts_dir = self.workspace_root / 'scripts'
-            if scripts_dir.exists() and not workspace_scripts_dir.exists():
-                shutil.copytree(scripts_dir, workspace_scripts_dir)
+            if scripts_dir.exists():
+                shutil.copytree(scripts_dir, workspace_scripts_dir, dirs_exist_ok=True)
 
             return True    
         except Exception as e:
-            st.error(f"Error initializing workspace: {e}")
+            print(f"Error initializing workspace: {e}")
             return False
         
     def parse_job_directory(self, job: Job) -> Path:
@@ -69,7 +82,133 @@ class WorkspaceService:
 
         return job_dir
 
+    def store_source(self, stream: BinaryIO, filename: str, max_bytes: Optional[int] = None) -> Path:
+        """
+        Store an uploaded source file once, keyed by its content hash.
+        Jobs rendering the same scene link to the stored file instead of copying it.
+        
+        Args:
+            stream (BinaryIO): Readable stream with the file content
+            filename (str): Name of the source file
+            max_bytes (Optional[int]): Limit on the file size, None for no limit
+            
+        Returns:
+            Path: Path to the stored source file
+
+        Raises:
+            ValueError: If the file exceeds max_bytes
+        """
+        filename = Path(filename).name
+        sources_dir = self.workspace_root / 'sources'
+        sources_dir.mkdir(parents=True, exist_ok=True)
+
+        digest = hashlib.sha256()
+        tmp_file = tempfile.NamedTemporaryFile(dir=sources_dir, delete=False)
+        try:
+            # Inside the try, so a failing read (e.g. an aborted upload) removes the partial file
+            with tmp_file:
+                while chunk := stream.read(1024 * 1024):
+                    digest.update(chunk)
+                    tmp_file.write(chunk)
+                    if max_bytes is not None and tmp_file.tell() > max_bytes:
+                        raise ValueError(f"Source file exceeds {max_bytes} bytes")
+
+            source_dir = sources_dir / digest.hexdigest()
+            source_path = source_dir / filename
+            if source_path.exists():
+                # Refresh the change time so the janitor does not collect the source before jobs link to it
+                os.utime(source_path)
+            else:
+                source_dir.mkdir(exist_ok=True)
+                os.chmod(tmp_file.name, 0o644)
+                os.replace(tmp_file.name, source_path)
+            return source_path
+        finally:
+            if os.path.exists(tmp_file.name):
+                os.unlink(tmp_file.name)
+
+    def resolve_source(self, source_id: str) -> Path:
+        """
+        Resolve a stored source id (<sha256>/<filename>) to its path.
+        
+        Args:
+            source_id (str): Source id relative to the sources directory
+            
+        Returns:
+            Path: Path to the stored source file
+
+        Raises:
+            FileNotFoundError: If no such source is stored
+        """
+        sources_dir = (self.workspace_root / 'sources').resolve()
+        source_path = (sources_dir / source_id).resolve()
+        if not source_path.is_relative_to(sources_dir) or not source_path.is_file():
+            raise FileNotFoundError(f"Source {source_id} not found")
+        return source_path
+
+    def link_job_source(self, job: Job, source_path: Path) -> Path:
+        """
+        Create a job directory whose source is a link to a stored source file.
+        
+        Args:
+            job (Job): Created job instance
+            source_path (Path): Stored source file
+            
+        Returns:
+            Path: Path to the created job directory
+
+        Raises:
+            FileNotFoundError: If the stored source no longer exists
+        """
+        job_dir = self.parse_job_directory(job)
+        src_dir = job_dir / 'src'
+        src_dir.mkdir(parents=True, exist_ok=True)
+
+        self.link_file(source_path, src_dir / source_path.name)
+        return job_dir
+
+    @staticmethod
+    def link_file(target: Path, link: Path):
+        """
+        Hard link a stored file into a job directory, falling back to a symlink only where
+        the file system cannot hard link.
+
+        Raises:
+            FileNotFoundError: If the target does not exist
+        """
+        try:
+            os.link(target, link)
+        except OSError as e:
+            if e.errno not in LINK_UNSUPPORTED_ERRNOS:
+                raise
+            os.symlink(target, link)
+
+    def get_contact_sheet(self, job: Job, tile_width: int, index: int) -> Path:
+        """
+        Resolve the path of a pre-generated contact sheet.
+        
+        Args:
+            job (Job): Job instance
+            tile_width (int): Thumbnail width of the zoom level
+            index (int): Zero-based sheet index within the zoom level
+            
+        Returns:
+            Path: Path to the contact sheet image
+        """
+        return self.parse_job_directory(job) / 'sheets' / str(tile_width) / f'{index + 1:03d}.jpg'
+
     def get_output_files(self, job: Job) -> List[Tuple[Path, Path]]:
+        """
+        Scan a job's render and static directories for output pairs.
+        This walks the file system and is only meant for rebuilding the output manifest.
+        
+        Args:
+            job (Job): Job instance to scan
+            
+        Returns:
+            List[Tuple[Path, Path]]: (render_file, static_file) pairs found on disk, for animations
+            whose raw render was dropped the MP4 is used as both
+        """
         try:
             job_dir = self.parse_job_directory(job)
             render_dir = job_dir / 'render'
@@ -81,20 +220,27 @@ class WorkspaceService:
             render_pairs = []
             if render_dir.exists() and static_dir.exists():
                 for render_file in render_files:
-                    static_files = static_dir.glob(f"{render_file.stem}.*")
-                    if static_files:
-                        render_pairs.append((render_file, next(static_files)))
+                    static_file = next(static_dir.glob(f"{render_file.stem}.*"), None)
+                    if static_file:
+                        render_pairs.append((render_file, static_file))
+
+            if job.mode == RenderMode.anim and static_dir.exists():
+                rendered_stems = {render_file.stem for render_file in render_files}
+                for static_file in static_dir.glob('*.mp4'):
+                    if static_file.stem not in rendered_stems and not static_file.stem.endswith(PREVIEW_SUFFIX):
+                        render_pairs.append((static_file, static_file))
 
             return render_pairs
         except:
             return []
 
-    def delete_job(self, job: Job) -> bool:
+    def delete_job(self, job: Job, executor: Optional[Executor] = None) -> bool:
         """
         Delete a job's workspace directory.
         
         Args:
             job (Job): Job instance to delete
+            executor (Optional[Executor]): Executor used to unlink files in parallel
             
         Returns:
             bool: True if deletion successful, False otherwise
@@ -102,8 +248,109 @@ class WorkspaceService:
         try:
             job_dir = self.parse_job_directory(job)
             if job_dir.exists():
-                shutil.rmtree(job_dir)
+                if executor:
+                    self.remove_tree(job_dir, executor)
+                else:
+                    shutil.rmtree(job_dir)
             return True
         except Exception as e:
-            st.error(f"Error deleting job workspace: {e}")
+            print(f"Error deleting job workspace: {e}")
             return False
+
+    @staticmethod
+    def remove_tree(path: Path, executor: Executor) -> None:
+        """
+        Remove a directory tree, unlinking files in parallel.
+        EFS deletes are latency bound, so parallel unlinks reclaim large jobs much faster than rmtree.
+        
+        Args:
+            path (Path): Directory to remove
+            executor (Executor): Executor used to unlink files
+        """
+        files, dirs = [], []
+        for root, dirnames, filenames in os.walk(path):
+            dirs.append(root)
+            files.extend(os.path.join(root, name) for name in filenames)
+            # Symlinks to directories are not followed and are removed like files
+            files.extend(os.path.join(root, name) for name in dirnames if os.path.islink(os.path.join(root, name)))
+
+        list(executor.map(os.unlink, files))
+        for directory in reversed(dirs):
+            os.rmdir(directory)
+
+    def get_storage_usage(self, job: Job) -> int:
+        """
+        Compute the number of bytes a job's workspace directory occupies.
+        Files shared through hard links (stored sources, bundle assets) count with an equal
+        share per link, so shared files are not counted in full for every job.
+        
+        Args:
+            job (Job): Job instance
+            
+        Returns:
+            int: Total size of the files in the job directory
+        """
+        total = 0
+        pending = [self.parse_job_directory(job)]
+        while pending:
+            try:
+                entries = list(os.scandir(pending.pop()))
+            except FileNotFoundError:
+                continue
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    pending.append(entry.path)
+                else:
+                    stat = entry.stat(follow_symlinks=False)
+                    total += stat.st_size // max(stat.st_nlink, 1)
+        return total
+
+    def drop_intermediates(self, job: Job) -> bool:
+        """
+        Remove regenerable intermediates: the HLS renditions, which can be segmented again from
+        the MP4. Raw renders are the only full-quality outputs and are always kept.
+        
+        Args:
+            job (Job): Job instance
+            
+        Returns:
+            bool: True if anything was removed
+        """
+        stream_dir = self.parse_job_directory(job) / 'stream'
+        if not stream_dir.exists():
+            return False
+        shutil.rmtree(stream_dir)
+        return True
+
+    def compress_originals(self, job: Job) -> bool:
+        """
+        Gzip uncompressed source .blend files in place. Blender opens gzip-compressed
+        .blend files directly, so jobs stay re-renderable and downloadable.
+        Files shared with other jobs or the source cache are skipped, compressing them
+        would give every job a private copy and increase storage instead.
+        
+        Args:
+            job (Job): Job instance
+            
+        Returns:
+            bool: True if any file was compressed
+        """
+        src_dir = self.parse_job_directory(job) / 'src'
+        compressed = False
+
+        for blend_file in (src_dir.rglob('*.blend') if src_dir.exists() else []):
+            if blend_file.is_symlink() or blend_file.stat().st_nlink > 1:
+                continue
+            with open(blend_file, 'rb') as f:
+                magic = f.read(4)
+            if magic.startswith(GZIP_MAGIC) or magic == ZSTD_MAGIC:
+                continue
+
+            tmp_file = blend_file.with_name(blend_file.name + '.tmp')
+            with open(blend_file, 'rb') as src, gzip.open(tmp_file, 'wb') as dst:
+                shutil.copyfileobj(src, dst, 1024 * 1024)
+            # Replace the directory entry only, files shared through hard links are left intact
+            os.replace(tmp_file, blend_file)
+            compressed = True
+
+        return compressed
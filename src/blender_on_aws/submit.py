@@ -0,0 +1,107 @@
+import argparse
+import json
+import os
+import sys
+from pathlib import Path
+
+from blender_on_aws.services.batch_service import BatchService
+from blender_on_aws.utils.runtime import StartupError, initialize_runtime
+
+
+def parse_value(value: str):
+    """Interpret a command line override value as int, float or string."""
+    for cast in (int, float):
+        try:
+            return cast(value)
+        except ValueError:
+            pass
+    return value
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Submit a batch of render jobs sharing one scene")
+    parser.add_argument(
+        "-c",
+        "--config",
+        default="config.yaml",
+        help="Path to config file (default: config.yaml)",
+    )
+    parser.add_argument(
+        "source",
+        help="Path to the .blend file, or to a project directory or zip/tar archive with its assets",
+    )
+    parser.add_argument(
+        "--main",
+        help="Main .blend file inside a project directory or archive (default: the only top-level .blend)",
+    )
+    parser.add_argument("-n", "--name", required=True, help="Job name shared by the batch")
+    parser.add_argument("-m", "--mode", default="still", help="Render mode: still or anim (default: still)")
+    parser.add_argument("-f", "--frames", default="1", help="Frame range (still: 1..10,15, anim: 1-250)")
+    parser.add_argument(
+        "-s",
+        "--set",
+        action="append",
+        default=[],
+        metavar="KEY=V1,V2",
+        help="Sweep an override over comma separated values (repeatable, combined as a matrix)",
+    )
+    parser.add_argument(
+        "-o",
+        "--overrides",
+        help="JSON file with a list of override sets, combined with every --set point",
+    )
+    args = parser.parse_args()
+
+    try:
+        config, workspace_service, db_service = initialize_runtime(args.config)
+    except StartupError as e:
+        sys.exit(f"Submit failed to start ({e.stage}): {e}")
+
+    max_bundle_size = config['workspace'].get('max_bundle_size')
+    max_bundle_bytes = int(max_bundle_size) * 1024 * 1024 if max_bundle_size else None
+    max_batch_jobs = config['workspace'].get('max_batch_jobs', 1000)
+    batch_service = BatchService(
+        workspace_service,
+        db_service,
+        max_batch_jobs=int(max_batch_jobs) if max_batch_jobs else None,
+        max_bundle_bytes=max_bundle_bytes,
+    )
+
+    try:
+        matrix = {}
+        for sweep in args.set:
+            key, values = sweep.split("=", 1)
+            matrix[key] = [parse_value(value) for value in values.split(",")]
+
+        overrides = None
+        if args.overrides:
+            with open(args.overrides) as f:
+                overrides = json.load(f)
+
+        mode = batch_service.parse_mode(args.mode)
+        variations = batch_service.expand_variations(overrides, matrix)
+
+        bundle_files = None
+        if os.path.isdir(args.source):
+            _, bundle_files, new_assets = batch_service.bundle_service.store_directory(Path(args.source))
+        elif not args.source.endswith(".blend"):
+            with open(args.source, "rb") as f:
+                _, bundle_files, new_assets = batch_service.bundle_service.store_archive(f)
+
+        if bundle_files:
+            print(f"Stored {new_assets} new of {len(bundle_files)} project files", file=sys.stderr)
+            source_path = Path(batch_service.bundle_service.find_main_file(bundle_files, args.main))
+        else:
+            with open(args.source, "rb") as f:
+                source_path = workspace_service.store_source(
+                    f, os.path.basename(args.source), max_bytes=max_bundle_bytes
+                )
+
+        jobs = batch_service.submit(args.name, source_path, mode, args.frames, variations, bundle_files)
+    except ValueError as e:
+        sys.exit(f"Invalid batch: {e}")
+    except FileNotFoundError as e:
+        sys.exit(f"Source files were removed while submitting, submit again: {e}")
+
+    for job in jobs:
+        print(f"{job.id}\t{job.overrides or '{}'}")
@@ -0,0 +1,101 @@
+from bisect import bisect_right
+from pathlib import Path
+from typing import List, Optional, Tuple
+import re
+
+from blender_on_aws.models.job import RenderMode
+
+
+# Highest frame number Blender accepts
+MAX_FRAME = 1048574
+# Blender names rendered animations after their frame range, e.g. 000001-000250.mkv
+RENDERED_RANGE = re.compile(r'(?P<start>\d+)-(?P<end>\d+)$')
+
+
+class FrameSet:
+    """Set of frame numbers stored as sorted, non-overlapping (start, end) ranges."""
+
+    def __init__(self, ranges: List[Tuple[int, int]]):
+        merged = []
+        for start, end in sorted(ranges):
+            if merged and start <= merged[-1][1] + 1:
+                merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+            else:
+                merged.append((start, end))
+        self.ranges = merged
+        self._starts = [start for start, _ in merged]
+
+    def __contains__(self, frame: int) -> bool:
+        index = bisect_right(self._starts, frame) - 1
+        return index >= 0 and frame <= self.ranges[index][1]
+
+    def __len__(self) -> int:
+        return sum(end - start + 1 for start, end in self.ranges)
+
+    def __repr__(self):
+        return f"FrameSet({self.ranges})"
+
+
+def parse_frames(frame_spec: str) -> FrameSet:
+    """Parse a frame specification into a set of frame numbers.
+    Ranges are kept as ranges, so a huge range costs no more than a small one.
+    
+    Args:
+        frame_spec (str): Single number (e.g. 1), range (e.g. 1..100) or list (e.g. 1,2,3), combinable (e.g. 1..10,15)
+        
+    Returns:
+        FrameSet: Frame numbers described by the specification
+
+    Raises:
+        ValueError: If the specification is malformed or contains frames outside 1..MAX_FRAME
+    """
+    ranges = []
+    for part in frame_spec.split(","):
+        part = part.strip()
+        if ".." in part:
+            start, end = map(int, part.split(".."))
+            if start > end:
+                raise ValueError(f"Invalid frame range {part}")
+        else:
+            start = end = int(part)
+        if start < 1 or end > MAX_FRAME:
+            raise ValueError(f"Frame numbers must be between 1 and {MAX_FRAME}")
+        ranges.append((start, end))
+    return FrameSet(ranges)
+
+
+def count_frames(mode: str, frame_range: str) -> Optional[int]:
+    """Count the frames a job renders.
+
+    Args:
+        mode (str): Render mode value (Still Frame or Animation)
+        frame_range (str): Still frame specification (see parse_frames) or animation range start-end
+
+    Returns:
+        Optional[int]: Number of frames, None for an animation without an end frame (it renders to the scene's end)
+
+    Raises:
+        ValueError: If the frame range is malformed
+    """
+    if mode == RenderMode.still:
+        return len(parse_frames(frame_range))
+
+    frames = [int(frame) for frame in str(frame_range).split('-')]
+    if len(frames) < 2:
+        return None
+    return frames[1] - frames[0] + 1
+
+
+def count_rendered_frames(render_file: Path) -> Optional[int]:
+    """Count the frames of a rendered animation from its file name.
+
+    Args:
+        render_file (Path): Video written by Blender, named <start>-<end>
+
+    Returns:
+        Optional[int]: Number of frames, None if the name does not contain the range
+    """
+    match = RENDERED_RANGE.search(render_file.stem)
+    if match is None:
+        return None
+    return int(match.group('end')) - int(match.group('start')) + 1
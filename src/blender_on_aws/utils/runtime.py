@@ -0,0 +1,98 @@
+import json
+import os
+import subprocess
+import sys
+from typing import Dict, Tuple
+
+from blender_on_aws.config.config_loader import ConfigLoader
+from blender_on_aws.services.db_service import DatabaseService
+from blender_on_aws.services.workspace_service import WorkspaceService
+
+# UI packages a headless process must never import
+UI_MODULES = ('streamlit', 'pandas')
+
+# Runs in a fresh interpreter so import time and memory are measured from a cold start
+STARTUP_PROBE = '''
+import json, resource, sys, time
+start = time.perf_counter()
+from blender_on_aws.utils.runtime import initialize_runtime, UI_MODULES
+config, workspace_service, db_service = initialize_runtime(sys.argv[1])
+from blender_on_aws.workers.render_worker import RenderWorker
+RenderWorker(workspace_service, db_service, config.get('worker', {}))
+print(json.dumps({
+    'startup_seconds': time.perf_counter() - start,
+    'rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    'ui_modules': sorted(name for name in UI_MODULES if name in sys.modules),
+}))
+'''
+
+
+class StartupError(Exception):
+    """Raised when a headless process cannot start, naming the stage that failed."""
+
+    def __init__(self, stage: str, message: str):
+        super().__init__(message)
+        self.stage = stage
+
+
+def initialize_runtime(config_path: str) -> Tuple[Dict, WorkspaceService, DatabaseService]:
+    """Initialize configuration, workspace and database for a headless process such as the worker.
+
+    Unlike initialize_app this neither parses argv nor touches Streamlit.
+
+    Args:
+        config_path (str): Path to the YAML config file
+
+    Returns:
+        tuple: (config, workspace_service, db_service)
+
+    Raises:
+        StartupError: If the configuration, workspace or database cannot be initialized
+    """
+    config = ConfigLoader.load_config(config_path)
+    if not config:
+        raise StartupError('config', f"Failed to load configuration from {config_path}")
+    if 'root' not in config.get('workspace', {}):
+        raise StartupError('config', f"Missing workspace.root in {config_path}")
+
+    workspace_service = WorkspaceService(config)
+    if not workspace_service.initialize_workspace():
+        raise StartupError('workspace', f"Failed to initialize workspace {workspace_service.workspace_root}")
+
+    try:
+        db_service = DatabaseService(os.path.join(workspace_service.workspace_root, 'db.sqlite'))
+    except Exception as e:
+        raise StartupError('database', f"Failed to open database: {e}") from e
+
+    return config, workspace_service, db_service
+
+
+def check_startup(config_path: str, max_seconds: float, max_rss_mb: float) -> Dict:
+    """Start the worker runtime in a fresh interpreter and compare its cost against a budget.
+
+    Args:
+        config_path (str): Path to the YAML config file
+        max_seconds (float): Budget for imports and initialization
+        max_rss_mb (float): Budget for the peak resident memory
+
+    Returns:
+        Dict: Measurements and a list of budget violations under 'errors'
+    """
+    result = subprocess.run(
+        [sys.executable, '-c', STARTUP_PROBE, config_path],
+        capture_output=True,
+        text=True,
+    )
+    if result.returncode != 0:
+        return {'errors': [f"Worker runtime failed to start: {result.stderr.strip()}"]}
+
+    report = json.loads(result.stdout.strip().splitlines()[-1])
+    errors = []
+    if report['startup_seconds'] > max_seconds:
+        errors.append(f"Startup took {report['startup_seconds']:.2f}s, budget is {max_seconds:.2f}s")
+    if report['rss_mb'] > max_rss_mb:
+        errors.append(f"Peak RSS is {report['rss_mb']:.0f} MB, budget is {max_rss_mb:.0f} MB")
+    if report['ui_modules']:
+        errors.append(f"UI modules imported: {', '.join(report['ui_modules'])}")
+    report['errors'] = errors
+    return report
@@ -1,18 +1,50 @@
-import streamlit as st
-import pandas as pd
+import argparse
+import logging
+import sys
 
-from blender_on_aws.models.job import RenderMode
-from blender_on_aws.workers.render_worker import RenderWorker
-from blender_on_aws.utils.styles import get_common_styles
-from blender_on_aws.utils.config_init import initialize_app
-import streamlit as st
-import pandas as pd
+from blender_on_aws.utils.runtime import StartupError, check_startup, initialize_runtime
 
 
 def main():
-    # Initialize app and get config/workspace service
-    _, workspace_service, db_service = initialize_app()
-    render_worker = RenderWorker(workspace_service, db_service)
+    parser = argparse.ArgumentParser(description="Blender on AWS render worker")
+    parser.add_argument(
+        "-c",
+        "--config",
+        default="config.yaml",
+        help="Path to config file (default: config.yaml)",
+    )
+    parser.add_argument(
+        "--check-startup",
+        action="store_true",
+        help="Measure startup time and memory against worker.startup_budget and exit",
+    )
+    args = parser.parse_args()
+
+    try:
+        config, workspace_service, db_service = initialize_runtime(args.config)
+    except StartupError as e:
+        sys.exit(f"Worker failed to start ({e.stage}): {e}")
+    worker_config = config.get('worker', {})
+
+    if args.check_startup:
+        budget = worker_config.get('startup_budget', {})
+        report = check_startup(
+            args.config,
+            max_seconds=float(budget.get('seconds', 2.0)),
+            max_rss_mb=float(budget.get('rss_mb', 150)),
+        )
+        for error in report['errors']:
+            print(error, file=sys.stderr)
+        if 'startup_seconds' in report:
+            print(f"Startup {report['startup_seconds']:.2f}s, peak RSS {report['rss_mb']:.0f} MB")
+        sys.exit(1 if report['errors'] else 0)
+
+    # Imported once the runtime is up, so configuration errors surface without loading the render stack
+    from blender_on_aws.workers.render_worker import RenderWorker
+
+    # Render output also goes to the journal, each job's log additionally keeps its own copy
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+    render_worker = RenderWorker(workspace_service, db_service, worker_config)
 
     print('Starting Worker...')
 
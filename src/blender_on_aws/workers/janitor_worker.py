@@ -0,0 +1,125 @@
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Optional
+import time
+
+from blender_on_aws.models.db import Job
+from blender_on_aws.services.bundle_service import BundleService
+from blender_on_aws.services.db_service import DatabaseService
+from blender_on_aws.services.metrics_service import MetricsService
+from blender_on_aws.services.workspace_service import WorkspaceService
+
+
+class JanitorWorker:
+    """Background worker reclaiming deleted jobs and applying workspace retention policies."""
+
+    def __init__(
+        self,
+        workspace_service: WorkspaceService,
+        db_service: DatabaseService,
+        config: Dict,
+        metrics_service: Optional[MetricsService] = None,
+    ):
+        """
+        Initialize the janitor worker.
+
+        Args:
+            workspace_service (WorkspaceService): Workspace service owning job directories
+            db_service (DatabaseService): Database service holding the jobs
+            config (Dict): Retention configuration (the `retention` section of the app config)
+            metrics_service (Optional[MetricsService]): Publishes autoscaling metrics on every pass if given
+        """
+        self.workspace_service = workspace_service
+        self.db_service = db_service
+        self.metrics_service = metrics_service
+        self.bundle_service = BundleService(workspace_service)
+
+        self.delete_interval = int(config.get('delete_interval_seconds', 30))
+        self.retention_interval = int(config.get('interval_seconds', 3600))
+        self.delete_workers = int(config.get('delete_workers', 8))
+        self.drop_intermediates_after = self._days(config.get('drop_intermediates_after_days'))
+        self.compress_originals_after = self._days(config.get('compress_originals_after_days'))
+        self.expire_after = self._days(config.get('expire_after_days'))
+        self.collect_assets_after = self._days(config.get('collect_assets_after_days'))
+
+    @staticmethod
+    def _days(value) -> Optional[timedelta]:
+        """Convert a day count from the config into a timedelta, None disables the tier."""
+        return timedelta(days=float(value)) if value is not None else None
+
+    def reclaim_deleted_jobs(self, executor: ThreadPoolExecutor):
+        """Remove the workspace and database rows of jobs marked for deletion."""
+        for job in self.db_service.get_deleted_jobs():
+            print(f"Reclaiming {job.name}-{job.id}")
+            if self.workspace_service.delete_job(job, executor):
+                self.db_service.delete_job(job.id)
+
+    def apply_retention(self, job: Job, now: datetime) -> bool:
+        """
+        Apply retention tiers to a finished job.
+
+        Returns:
+            bool: True if the job's workspace was modified
+        """
+        finished_at = job.finished_at
+        if finished_at.tzinfo is None:
+            # SQLite drops the timezone, stored values are UTC
+            finished_at = finished_at.replace(tzinfo=timezone.utc)
+        age = now - finished_at
+        changed = False
+
+        if self.expire_after is not None and age >= self.expire_after:
+            print(f"Expiring {job.name}-{job.id}")
+            self.db_service.mark_job_deleted(job.id)
+            return False
+
+        if self.drop_intermediates_after is not None and age >= self.drop_intermediates_after:
+            if self.workspace_service.drop_intermediates(job):
+                print(f"Dropped intermediates of {job.name}-{job.id}")
+                changed = True
+
+        if self.compress_originals_after is not None and age >= self.compress_originals_after:
+            if self.workspace_service.compress_originals(job):
+                print(f"Compressed originals of {job.name}-{job.id}")
+                changed = True
+
+        return changed
+
+    def apply_retention_policies(self):
+        """Apply retention tiers to all finished jobs and refresh their storage usage."""
+        # Workers that have been dead for a day are no longer worth showing
+        self.db_service.prune_workers(timedelta(days=1))
+
+        if self.collect_assets_after is not None:
+            removed = self.bundle_service.collect_unused(self.collect_assets_after)
+            if removed:
+                print(f"Removed {removed} unused assets and sources")
+
+        now = datetime.now(timezone.utc)
+        for job in self.db_service.get_all_jobs():
+            if job.status not in ('complete', 'failed') or job.finished_at is None:
+                continue
+
+            changed = self.apply_retention(job, now)
+            # Storage is measured once a job finishes and again after retention changed it
+            if changed or job.storage_bytes is None:
+                self.db_service.update_job(
+                    job.id,
+                    storage_bytes=self.workspace_service.get_storage_usage(job),
+                )
+
+    def run(self):
+        """Reclaim deleted jobs and publish metrics every few seconds, apply retention policies at a longer interval."""
+        next_retention = 0.0
+        with ThreadPoolExecutor(max_workers=self.delete_workers) as executor:
+            while True:
+                try:
+                    if time.monotonic() >= next_retention:
+                        self.apply_retention_policies()
+                        next_retention = time.monotonic() + self.retention_interval
+                    self.reclaim_deleted_jobs(executor)
+                    if self.metrics_service:
+                        self.metrics_service.publish()
+                except Exception as e:
+                    print(f"Janitor pass failed: {e}")
+                time.sleep(self.delete_interval)
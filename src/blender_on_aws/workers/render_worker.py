@@ -1,46 +1,157 @@
 from datetime import datetime, timezone
+from typing import Dict, Optional
+import os
+import socket
+import threading
 import time
 
-from blender_on_aws.models.db import Job
-from blender_on_aws.services.blender_service import BlenderService
+from blender_on_aws.models.db import Job, get_worker_dead_after
+from blender_on_aws.models.job import RenderMode
+from blender_on_aws.services.blender_service import BlenderService, RenderCancelledError
 from blender_on_aws.services.db_service import DatabaseService
+from blender_on_aws.services.log_service import LogService
+from blender_on_aws.services.manifest_service import ManifestService
 from blender_on_aws.services.workspace_service import WorkspaceService
+from blender_on_aws.utils.frames import count_rendered_frames
 
 
 class RenderWorker:
     """Worker thread to process render jobs from a queue."""
-    
-    def __init__(self, workspace_service: WorkspaceService, db_service: DatabaseService):
+
+    def __init__(self, workspace_service: WorkspaceService, db_service: DatabaseService, config: Optional[Dict] = None):
         """
         Initialize the render worker.
-        
+
         Args:
-            workspace_root (Path): Path to workspace root directory
+            workspace_service (WorkspaceService): Workspace service owning job directories
+            db_service (DatabaseService): Database service holding the queue
+            config (Optional[Dict]): Worker configuration (the `worker` section of the app config)
         """
-        self.blender_service = BlenderService(workspace_service.workspace_root)
+        config = config or {}
+        stall_timeout = config.get('stall_timeout_seconds', 900)
+        ffmpeg_timeout = config.get('ffmpeg_timeout_seconds', 3600)
+
+        self.max_attempts = int(config.get('max_attempts', 3))
+        self.heartbeat_interval = float(config.get('heartbeat_seconds', 30))
+        self.dead_after = get_worker_dead_after(config)
+
+        self.blender_service = BlenderService(
+            workspace_service.workspace_root,
+            stall_timeout=float(stall_timeout) if stall_timeout is not None else None,
+            poll_interval=min(10.0, self.heartbeat_interval),
+            ffmpeg_timeout=float(ffmpeg_timeout) if ffmpeg_timeout is not None else None,
+        )
 
         self.db_service = db_service
         self.workspace_service = workspace_service
+        self.manifest_service = ManifestService(workspace_service, db_service)
+        self.log_service = LogService(
+            workspace_service,
+            max_bytes=int(config.get('log_max_bytes', 10 * 1024 * 1024)),
+            backup_count=int(config.get('log_backup_count', 3)),
+        )
 
-    def render(self, job: Job):
-        print(f"Starting {job.name}-{job.id}")
+        self.hostname = socket.gethostname()
+        self.worker_id = f"{self.hostname}-{os.getpid()}"
 
-        job_dir = self.workspace_service.parse_job_directory(job)
+    def heartbeat(self, job_id: Optional[int] = None):
+        """Record that this worker is alive and which job it is working on."""
+        try:
+            self.db_service.record_heartbeat(self.worker_id, self.hostname, job_id)
+        except Exception as e:
+            print(f"Failed to record heartbeat: {e}")
 
-        self.db_service.update_job(
-            job.id,
-            status='active',
-        )
+    def _heartbeat_loop(self, job_id: int, stop: threading.Event, cancel: threading.Event):
+        """Keep sending heartbeats while a job renders and post-processes, cancel it once it is deleted."""
+        while not stop.wait(self.heartbeat_interval):
+            self.heartbeat(job_id)
+            try:
+                job = self.db_service.get_job(job_id)
+                if job is None or job.deleted_at is not None:
+                    cancel.set()
+            except Exception as e:
+                print(f"Failed to check job {job_id}: {e}")
+
+    def _record_output(self, job: Job, cancel: threading.Event, *output_files):
+        """Record an output in the manifest, stop post-processing once the job was deleted."""
+        if cancel.is_set():
+            raise RenderCancelledError("Job was deleted")
+        self.manifest_service.record_output(job, *output_files)
 
-        self.blender_service.render_blend_file(
-            job_dir=job_dir,
-            job=job,
+    def render(self, job: Job):
+        print(f"Starting {job.name}-{job.id} (attempt {job.attempts}/{self.max_attempts})")
+        self.heartbeat(job.id)
+        stop_heartbeat = threading.Event()
+        cancel = threading.Event()
+        heartbeat_thread = threading.Thread(
+            target=self._heartbeat_loop, args=(job.id, stop_heartbeat, cancel), daemon=True
         )
+        heartbeat_thread.start()
+
+        job_dir = self.workspace_service.parse_job_directory(job)
+        rendered_frames = None
+
+        try:
+            with self.log_service.capture(job) as job_log:
+                job_log.info(f"Attempt {job.attempts}/{self.max_attempts} on {self.worker_id}")
+                try:
+                    outputs, _, _ = self.blender_service.render_blend_file(
+                        job_dir=job_dir,
+                        job=job,
+                        on_output=lambda *output_files: self._record_output(job, cancel, *output_files),
+                        cancel=cancel,
+                    )
+                    # Animations without an end frame render to the scene's end, record how far that was
+                    if job.mode == RenderMode.anim and outputs:
+                        rendered_frames = count_rendered_frames(outputs[0][0])
+                    # The heartbeat only checks periodically, a job deleted since must not complete
+                    current = self.db_service.get_job(job.id)
+                    if current is None or current.deleted_at is not None:
+                        cancel.set()
+                        raise RenderCancelledError("Job was deleted")
+                except Exception as e:
+                    job_log.error(f"Render failed: {e}")
+                    raise
+        except Exception as e:
+            if cancel.is_set():
+                # Released as failed, the janitor reclaims deleted jobs once no worker holds them
+                print(f"Cancelled deleted Job {job.name}-{job.id}")
+                self.db_service.update_job(
+                    job.id,
+                    finished_at=datetime.now(timezone.utc),
+                    status='failed',
+                    last_error='Deleted while rendering',
+                    worker_id=None,
+                )
+            elif job.attempts >= self.max_attempts:
+                print(f"Failed Job {job.name}-{job.id}: {e}")
+                self.db_service.update_job(
+                    job.id,
+                    finished_at=datetime.now(timezone.utc),
+                    status='failed',
+                    last_error=str(e),
+                    worker_id=None,
+                )
+            else:
+                print(f"Requeued Job {job.name}-{job.id}: {e}")
+                self.db_service.update_job(
+                    job.id,
+                    status='queued',
+                    last_error=str(e),
+                    worker_id=None,
+                )
+            return ""
+        finally:
+            stop_heartbeat.set()
+            heartbeat_thread.join()
+            self.heartbeat()
 
         self.db_service.update_job(
             job.id,
             finished_at=datetime.now(timezone.utc),
             status='complete',
+            rendered_frames=rendered_frames,
+            worker_id=None,
         )
         print(f"Completed Job {job.name}-{job.id}")
         return ""
@@ -48,14 +159,24 @@ class RenderWorker:
     def run(self):
         """Process jobs from the queue."""
         while True:
+            self.heartbeat()
+
+            orphaned = self.db_service.requeue_orphaned_jobs(self.dead_after, self.max_attempts)
+            if orphaned:
+                print(f"Requeued or failed jobs of dead workers: {orphaned}")
+
             queued_jobs = self.db_service.get_queued_jobs()
             if not queued_jobs:
                 print('Idle...')
                 time.sleep(10)
+                continue
 
             print('Found queued jobs')
             for job in queued_jobs:
                 print(f'- {job.id}: {job.name}')
-            
+
             for job in queued_jobs:
-                self.render(job)
+                # Another worker may have claimed or deleted the job since the queue was read
+                claimed_job = self.db_service.claim_job(job.id, self.worker_id)
+                if claimed_job:
+                    self.render(claimed_job)
@@ -0,0 +1,44 @@
+import pytest
+
+from blender_on_aws.utils.runtime import check_startup
+
+
+@pytest.fixture
+def config_path(tmp_path):
+    path = tmp_path / 'config.yaml'
+    path.write_text(f"workspace:\n  root: {tmp_path / 'workspace'}\n")
+    return str(path)
+
+
+def test_worker_starts_within_budget(config_path):
+    report = check_startup(config_path, max_seconds=2.0, max_rss_mb=150)
+
+    assert report['errors'] == []
+    assert report['ui_modules'] == []
+
+
+def test_budget_violations_are_reported(config_path):
+    report = check_startup(config_path, max_seconds=0, max_rss_mb=0)
+
+    assert any(error.startswith('Startup took') for error in report['errors'])
+    assert any(error.startswith('Peak RSS') for error in report['errors'])
+
+
+def test_ui_imports_are_reported(config_path, tmp_path, monkeypatch):
+    # Simulate a regression where the worker stack pulls in the UI: every interpreter imports pandas
+    site_dir = tmp_path / 'site'
+    site_dir.mkdir()
+    (site_dir / 'sitecustomize.py').write_text("import sys, types\nsys.modules['pandas'] = types.ModuleType('pandas')\n")
+    monkeypatch.setenv('PYTHONPATH', str(site_dir))
+
+    report = check_startup(config_path, max_seconds=60, max_rss_mb=4096)
+
+    assert report['ui_modules'] == ['pandas']
+    assert report['errors'] == ['UI modules imported: pandas']
+
+
+def test_unloadable_config_is_reported(tmp_path):
+    report = check_startup(str(tmp_path / 'missing.yaml'), max_seconds=60, max_rss_mb=4096)
+
+    assert len(report['errors']) == 1
+    assert report['errors'][0].startswith('Worker runtime failed to start')